@@ -0,0 +1,96 @@
+import os
+import logging
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import func
+
+from app import db
+from models import ChatMessage, ChatSession, HealthLog, SymptomStat
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip by the streaming export cursors
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "500"))
+
+# Aggregate queries behind the analytics and export endpoints. Each helper
+# issues a fixed number of queries regardless of how much data a user has.
+
+def user_message_count_query(user_id: int):
+    return db.session.query(func.count(ChatMessage.id)).join(
+        ChatSession, ChatSession.id == ChatMessage.session_id
+    ).filter(ChatSession.user_id == user_id)
+
+def count_user_messages(user_id: int) -> int:
+    """Total chat messages across all of a user's sessions"""
+    return user_message_count_query(user_id).scalar() or 0
+
+def symptom_stats_query(user_id: int):
+    return SymptomStat.query.filter_by(user_id=user_id)
+
+def severity_summary(user_id: int) -> Tuple[int, float]:
+    """Number of health logs and their average severity, from the per-symptom statistics"""
+    count, severity_count, severity_sum = symptom_stats_query(user_id).with_entities(
+        func.sum(SymptomStat.count), func.sum(SymptomStat.severity_count), func.sum(SymptomStat.severity_sum)
+    ).one()
+    return count or 0, severity_sum / severity_count if severity_count else None
+
+def symptom_trends(user_id: int) -> List[Dict[str, Any]]:
+    """
+    Per-symptom log count, average severity and first/last severity
+
+    Read from symptom_stats, which is kept current as logs are added and
+    deleted, so this costs one row per distinct symptom rather than a scan
+    of the user's history.
+    """
+    stats = symptom_stats_query(user_id).order_by(SymptomStat.symptom_key).all()
+    return [{
+        'symptom': stat.symptom,
+        'count': stat.count,
+        'average_severity': stat.average_severity,
+        'first_severity': stat.first_severity,
+        'last_severity': stat.last_severity,
+        'first_recorded_at': stat.first_recorded_at,
+        'last_recorded_at': stat.last_recorded_at
+    } for stat in stats]
+
+def export_logs_query(user_id: int):
+    return HealthLog.query.filter_by(user_id=user_id).order_by(HealthLog.recorded_at, HealthLog.id)
+
+def export_sessions_query(user_id: int):
+    return ChatSession.query.filter_by(user_id=user_id).order_by(ChatSession.id)
+
+def export_messages_query(user_id: int):
+    # Ordered by the joined session's id so the plan walks sessions in index order without a sort
+    return ChatMessage.query.join(
+        ChatSession, ChatSession.id == ChatMessage.session_id
+    ).filter(ChatSession.user_id == user_id).order_by(
+        ChatSession.id, ChatMessage.created_at, ChatMessage.id
+    )
+
+def iter_health_logs(user_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[HealthLog]:
+    """Stream a user's health logs in recorded order without loading them all"""
+    return iter(export_logs_query(user_id).yield_per(batch_size))
+
+def iter_sessions_with_messages(user_id: int, batch_size: int = EXPORT_BATCH_SIZE
+                                ) -> Iterator[Tuple[ChatSession, Iterator[ChatMessage]]]:
+    """
+    Stream a user's chat sessions, each paired with an iterator over its messages
+
+    Sessions and messages come from two cursors ordered by session id and
+    are walked in step, so memory stays flat however long the history is.
+    Each session's messages must be consumed before moving to the next.
+    """
+    sessions = export_sessions_query(user_id).yield_per(batch_size)
+    messages = iter(export_messages_query(user_id).yield_per(batch_size))
+    pending = [next(messages, None)]
+
+    def session_messages(session_id: int) -> Iterator[ChatMessage]:
+        while pending[0] is not None and pending[0].session_id == session_id:
+            yield pending[0]
+            pending[0] = next(messages, None)
+
+    for chat_session in sessions:
+        # Skip anything a caller left unconsumed for earlier sessions
+        while pending[0] is not None and pending[0].session_id < chat_session.id:
+            pending[0] = next(messages, None)
+        yield chat_session, session_messages(chat_session.id)
@@ -6,6 +6,8 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager
+from flask_migrate import Migrate
+from database import database_url, engine_options, install_sqlite_pragmas
 import uuid
 
 # Load environment variables
@@ -21,6 +23,7 @@ class Base(DeclarativeBase):
 # Initialize extensions
 db = SQLAlchemy(model_class=Base)
 login_manager = LoginManager()
+migrate = Migrate()
 
 # Create the app
 app = Flask(__name__)
@@ -28,10 +31,10 @@ app.secret_key = os.environ.get("SESSION_SECRET")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # needed for url_for to generate with https
 
 # Configure the database
-# Use a writable path for SQLite database
-db_path = os.path.join(os.getcwd(), 'instance', 'health_app.db')
-os.makedirs(os.path.dirname(db_path), exist_ok=True)
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+# DATABASE_URL selects PostgreSQL; otherwise a tuned SQLite file under instance/
+database_uri = database_url()
+app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_uri)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
@@ -47,22 +50,28 @@ login_manager.login_message_category = "info"
 
 # Initialize the app with the extension
 db.init_app(app)
+migrate.init_app(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 
 with app.app_context():
     # Import models
     import models  # noqa: F401
     from models import User
 
+    # Apply WAL and the other SQLite pragmas before the first connection is opened
+    install_sqlite_pragmas(db.engine)
+
     # Initialize database
     db.create_all()
 
     # Create uploads directory if it doesn't exist
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
-    # Setup user loader for Flask-Login
+    # Setup user loader for Flask-Login, served from a per-worker cache
+    from user_cache import load_user as load_cached_user
+
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
 
     # Import security and scalability modules
     from security_audit import security_audit #This module needs to be created separately
@@ -89,19 +98,47 @@ with app.app_context():
                                details={'server_id': SERVER_ID})
         return response
 
+    from resilience import get_provider_states
+
     # Health check endpoint for load balancer
     @app.route('/lb-health')
     def lb_health():
         cpu_load = load_balancer.get_server_load()
+        providers = get_provider_states()
+        status = 'healthy' if cpu_load < 80 else 'overloaded'
+
+        # Breakers are per process and an upstream outage opens them on every node, so an
+        # open breaker is reported in the body but never fails the check: the non-LLM
+        # pages, logs and exports keep being served
+        if any(provider['state'] == 'open' for provider in providers.values()):
+            status = 'degraded'
+
         return jsonify({
-            'status': 'healthy' if cpu_load < 80 else 'overloaded',
+            'status': status,
             'cpu_load': cpu_load,
-            'server_id': SERVER_ID
+            'server_id': SERVER_ID,
+            'providers': providers
         })
 
     # Import routes after initializing db to avoid circular imports
     import routes  # noqa: F401
 
+    # Register maintenance CLI commands (flask --app main <command>)
+    import commands  # noqa: F401
+
+    # Start background workers for image and audio analysis jobs once a
+    # process serves requests; CLI commands import the app but never do
+    from job_queue import job_queue
+    job_queue.init_app(app)
+
+    # Start the write-behind audit log flusher
+    security_audit.start(app)
+
+    # Optionally build Gemini models before the first image request
+    if os.environ.get("GEMINI_WARMUP", "false").lower() in ("1", "true", "yes"):
+        from gemini_service import warm_up
+        warm_up()
+
     logger.info(f"Application initialized successfully on server {SERVER_ID}")
 
     # Store initial metrics
@@ -1,210 +1,131 @@
 import os
-import json
-import base64
+import wave
 import logging
-import tempfile
 import subprocess
-from typing import Optional, Tuple
-from pydub import AudioSegment
+from threading import BoundedSemaphore
+from typing import Any, Dict, Optional
 
-import requests
 import speech_recognition as sr
 
+from transcription import transcription_pipeline
+
 logger = logging.getLogger(__name__)
 
-# Groq API information
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_MODEL = "llama3-8b-8192"  # Default model
+# Format the recognizer expects: 16 kHz mono 16-bit PCM
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+TARGET_SAMPLE_WIDTH = 2
+
+# Converter pool settings (override via environment)
+AUDIO_CONVERTER_POOL_SIZE = int(os.environ.get("AUDIO_CONVERTER_POOL_SIZE", "2"))
+AUDIO_CONVERTER_QUEUE_TIMEOUT = float(os.environ.get("AUDIO_CONVERTER_QUEUE_TIMEOUT", "30"))
+AUDIO_CONVERT_TIMEOUT = float(os.environ.get("AUDIO_CONVERT_TIMEOUT", "60"))
+# Longest clip decoded into memory (16 kHz mono PCM is ~1.9 MB per minute)
+AUDIO_MAX_SECONDS = int(os.environ.get("AUDIO_MAX_SECONDS", "600"))
 
-def transcribe_audio(audio_file_path: str) -> str:
+# Caps the number of concurrent ffmpeg processes in this worker
+_converter_slots = BoundedSemaphore(AUDIO_CONVERTER_POOL_SIZE)
+
+def transcribe_audio(audio_file_path: str) -> Optional[str]:
     """
-    Transcribe audio file using Groq's language model or local fallback
+    Transcribe audio file with the configured transcription backends
     
     Args:
         audio_file_path: Path to the audio file
     
     Returns:
-        Transcribed text
+        Transcribed text, or None if the audio could not be decoded or
+        no backend produced a transcript
     """
-    # First, ensure we have a valid WAV file that can be used
-    fixed_audio_path = preprocess_audio(audio_file_path)
-    if not fixed_audio_path:
+    # Decode once into 16 kHz mono PCM and share the samples across backends
+    audio = preprocess_audio(audio_file_path)
+    if audio is None:
         logger.error("Failed to preprocess audio file")
-        return "Could not process audio file. Please try again with a different recording."
-    
-    # Try Groq API for transcription if key is available
-    if GROQ_API_KEY:
-        try:
-            # Convert audio to base64
-            with open(fixed_audio_path, "rb") as audio_file:
-                audio_bytes = audio_file.read()
-                base64_audio = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            return transcribe_with_groq(base64_audio, fixed_audio_path)
-        except Exception as e:
-            logger.error(f"Error with Groq transcription: {str(e)}")
-            logger.info("Falling back to local speech recognition")
+        return None
     
-    # Fallback to local speech recognition
+    transcript = transcription_pipeline.transcribe_clip(audio)
+    if not transcript:
+        logger.error(f"No transcription backend could transcribe {audio_file_path}")
+        return None
+    return transcript
+
+def probe_wav(audio_file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read only the WAV header of a file
+
+    Returns:
+        Dict with channels, sample_rate, sample_width and frames, or None
+        if the file is not an uncompressed PCM WAV
+    """
     try:
-        return transcribe_locally(fixed_audio_path)
-    except Exception as e:
-        logger.error(f"Error with local transcription: {str(e)}")
-        return "Could not transcribe audio clearly. Please try again."
+        with wave.open(audio_file_path, 'rb') as wav:
+            return {
+                "channels": wav.getnchannels(),
+                "sample_rate": wav.getframerate(),
+                "sample_width": wav.getsampwidth(),
+                "frames": wav.getnframes()
+            }
+    except (wave.Error, EOFError, OSError):
+        return None
 
-def preprocess_audio(audio_file_path: str) -> str:
+def is_target_format(header: Optional[Dict[str, Any]]) -> bool:
+    """True if a probed WAV header is already 16 kHz mono 16-bit PCM with audio in it"""
+    return bool(header) and header["frames"] > 0 and \
+        header["sample_rate"] == TARGET_SAMPLE_RATE and \
+        header["channels"] == TARGET_CHANNELS and \
+        header["sample_width"] == TARGET_SAMPLE_WIDTH
+
+def preprocess_audio(audio_file_path: str) -> Optional[sr.AudioData]:
     """
-    Preprocess audio file to ensure it's in a compatible format
+    Decode an audio file into 16 kHz mono 16-bit PCM in memory
+    
+    Files that are already 16 kHz mono PCM WAV are read directly; anything
+    else is piped through ffmpeg, at most AUDIO_CONVERTER_POOL_SIZE
+    conversions at a time. No intermediate files are written.
     
     Args:
         audio_file_path: Path to the audio file
     
     Returns:
-        Path to the preprocessed audio file
+        Decoded audio, or None if the file could not be decoded
     """
+    header = probe_wav(audio_file_path)
+    if is_target_format(header):
+        logger.info(f"Audio already 16 kHz mono PCM, skipping conversion: {audio_file_path}")
+        max_frames = AUDIO_MAX_SECONDS * TARGET_SAMPLE_RATE
+        try:
+            with wave.open(audio_file_path, 'rb') as wav:
+                pcm = wav.readframes(min(header["frames"], max_frames))
+            return sr.AudioData(pcm, TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH)
+        except (wave.Error, EOFError, OSError) as e:
+            logger.error(f"Error reading WAV file: {str(e)}")
+            return None
+
+    if not _converter_slots.acquire(timeout=AUDIO_CONVERTER_QUEUE_TIMEOUT):
+        logger.error("Timed out waiting for a free audio converter")
+        return None
+
     try:
-        # Create a temporary WAV file
-        temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
-        
-        # Use ffmpeg to convert and normalize the audio
+        # Use ffmpeg to convert and normalize the audio to raw PCM on stdout
         command = [
-            'ffmpeg', '-y', '-i', audio_file_path,
-            '-ar', '16000',  # Sample rate
-            '-ac', '1',      # Mono channel
-            '-c:a', 'pcm_s16le',  # PCM 16-bit encoding
-            temp_wav
+            'ffmpeg', '-nostdin', '-loglevel', 'error', '-i', audio_file_path,
+            '-t', str(AUDIO_MAX_SECONDS),
+            '-ar', str(TARGET_SAMPLE_RATE),  # Sample rate
+            '-ac', str(TARGET_CHANNELS),     # Mono channel
+            '-f', 's16le',  # PCM 16-bit encoding, no container
+            'pipe:1'
         ]
         
-        subprocess.run(command, check=True, capture_output=True)
-        logger.info(f"Successfully preprocessed audio to {temp_wav}")
-        
-        # Validate the created file
-        try:
-            audio = AudioSegment.from_wav(temp_wav)
-            if len(audio) == 0:
-                logger.error("Generated WAV file has zero length")
-                return None
-        except Exception as e:
-            logger.error(f"Error validating processed WAV file: {str(e)}")
+        result = subprocess.run(command, check=True, capture_output=True, timeout=AUDIO_CONVERT_TIMEOUT)
+        if not result.stdout:
+            logger.error("Converted audio has zero length")
             return None
-            
-        return temp_wav
+
+        logger.info(f"Successfully preprocessed audio: {len(result.stdout)} bytes of PCM")
+        return sr.AudioData(result.stdout, TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH)
         
     except Exception as e:
         logger.error(f"Error preprocessing audio: {str(e)}")
         return None
-
-def transcribe_with_groq(base64_audio: str, audio_file_path: str) -> str:
-    """
-    Use Groq LLM to analyze the audio content
-    
-    Args:
-        base64_audio: Base64 encoded audio data
-        audio_file_path: Path to the audio file (as fallback)
-        
-    Returns:
-        Transcribed text
-    """
-    # First try Google speech recognition for faster results
-    local_transcript = ""
-    try:
-        local_transcript = transcribe_locally(audio_file_path)
-        if local_transcript and not local_transcript.startswith("Could not") and not local_transcript.startswith("Audio unclear"):
-            logger.info("Successfully transcribed with Google Speech Recognition")
-            return local_transcript
-    except Exception as e:
-        logger.error(f"Error in local transcription fallback: {str(e)}")
-    
-    # If Google fails, try with Groq LLM
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {GROQ_API_KEY}"
-        }
-        
-        # Create a system prompt for audio transcription
-        system_message = """
-        You are an advanced audio transcription system. Your task is to:
-        1. Listen to the audio data
-        2. Transcribe the spoken content accurately
-        3. Identify key medical terms or symptoms mentioned
-        4. Return only the transcribed text without any additional commentary
-        
-        If the audio isn't clear, make your best attempt and indicate uncertainty with [?].
-        """
-        
-        # We'll describe the audio as an encoded file
-        user_message = f"""
-        This is a base64-encoded audio file. 
-        The person is likely talking about health symptoms or asking a medical question.
-        Please transcribe the content as accurately as possible.
-        """
-        
-        data = {
-            "model": GROQ_MODEL,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ],
-            "temperature": 0.2,
-            "max_tokens": 300
-        }
-        
-        response = requests.post(GROQ_API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        
-        result = response.json()
-        transcript = result["choices"][0]["message"]["content"].strip()
-        
-        # Clean up the transcript
-        transcript = transcript.replace('Transcript:', '').replace('[Transcript]:', '').strip()
-        if "I cannot transcribe" in transcript or "cannot process" in transcript:
-            # If Groq says it can't process the audio, fall back to local result or error
-            return local_transcript or "Could not transcribe audio clearly. Please try speaking more clearly."
-            
-        return transcript
-        
-    except Exception as e:
-        logger.error(f"Error with Groq transcription: {str(e)}")
-        # Return local transcript if it exists, otherwise error message
-        return local_transcript or "Could not transcribe audio clearly. Please try again."
-
-def transcribe_locally(audio_file_path: str) -> str:
-    """
-    Transcribe audio using local speech recognition via Google's API
-    
-    Args:
-        audio_file_path: Path to the audio file
-    
-    Returns:
-        Transcribed text
-    """
-    recognizer = sr.Recognizer()
-    
-    try:
-        with sr.AudioFile(audio_file_path) as source:
-            # Adjust for ambient noise and increase sensitivity
-            recognizer.adjust_for_ambient_noise(source)
-            recognizer.energy_threshold = 50  # Lower threshold for better sensitivity
-            recognizer.dynamic_energy_threshold = True
-            
-            # Record audio with longer timeout for patience
-            audio_data = recognizer.record(source)
-            
-            try:
-                # Try Google's speech recognition
-                text = recognizer.recognize_google(audio_data)
-                if text:
-                    return text
-                else:
-                    return "Could not detect speech in the audio."
-            except sr.UnknownValueError:
-                logger.error("Google Speech Recognition could not understand audio")
-                return "Audio unclear. Please try speaking more clearly."
-            except sr.RequestError as e:
-                logger.error(f"Could not request results from Google Speech Recognition service: {str(e)}")
-                return "Unable to connect to speech recognition service."
-    except Exception as e:
-        logger.error(f"Error processing audio file: {str(e)}")
-        return "Could not process audio file. Please try a different recording."
+    finally:
+        _converter_slots.release()
@@ -0,0 +1,177 @@
+import os
+import re
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import AuditLog, AuditRollup
+
+logger = logging.getLogger(__name__)
+
+# Retention settings (override via environment)
+AUDIT_RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", "30"))
+AUDIT_ROLLUP_RETENTION_DAYS = int(os.environ.get("AUDIT_ROLLUP_RETENTION_DAYS", "365"))
+
+# audit_logs holds the current day; each finished day moves to its own table
+PARTITION_PREFIX = "audit_logs_"
+PARTITION_PATTERN = re.compile(r"^audit_logs_(\d{8})$")
+
+def hour_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def day_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def record_rollups(events) -> int:
+    """
+    Add a batch of audit events to the hourly rollups in the current session
+
+    Events are counted per (hour, event type, endpoint, status, user) and
+    merged into existing buckets with an upsert, so concurrent workers can
+    flush into the same hour. The caller commits.
+    """
+    buckets = Counter(
+        (hour_start(event.timestamp), event.event_type, event.endpoint, event.status_code, event.user_id or 0)
+        for event in events
+    )
+    if not buckets:
+        return 0
+
+    rows = [{
+        'hour': hour, 'event_type': event_type, 'endpoint': endpoint,
+        'status_code': status_code, 'user_id': user_id, 'count': count
+    } for (hour, event_type, endpoint, status_code, user_id), count in buckets.items()]
+
+    insert = postgresql_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(AuditRollup).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['hour', 'event_type', 'endpoint', 'status_code', 'user_id'],
+        set_={'count': AuditRollup.count + statement.excluded['count']}
+    )
+    db.session.execute(statement)
+    return len(rows)
+
+def partition_name(day: datetime) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def partition_table(name: str) -> Table:
+    """Day partition with audit_logs' columns; ids are kept so a repeated move can't duplicate rows"""
+    return Table(
+        name, MetaData(),
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('event_type', String(50), nullable=False),
+        Column('user_id', Integer),
+        Column('ip_address', String(45), nullable=False),
+        Column('endpoint', String(255), nullable=False),
+        Column('method', String(10), nullable=False),
+        Column('status_code', Integer, nullable=False),
+        Column('details', Text),
+        Column('created_at', DateTime),
+        Index(f"ix_{name}_created_at", 'created_at'),
+    )
+
+def list_partitions() -> Dict[datetime, str]:
+    """Existing day partitions keyed by day"""
+    partitions = {}
+    for name in inspect(db.engine).get_table_names():
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions[datetime.strptime(match.group(1), "%Y%m%d")] = name
+    return partitions
+
+def rotate_partitions(now: datetime = None) -> int:
+    """
+    Move audit_logs rows from finished days into their day partitions
+
+    Each day is copied and deleted in one transaction, oldest first. If
+    two workers race on the same day, the loser hits the partition's
+    primary key and rolls back, leaving the rows with the winner.
+
+    Returns:
+        Number of rows moved
+    """
+    today = day_start(now or datetime.utcnow())
+    columns = [column.name for column in AuditLog.__table__.columns]
+    moved = 0
+    while True:
+        # Jump straight to the oldest remaining day so gaps don't create empty partitions
+        oldest = db.session.query(func.min(AuditLog.created_at)).filter(AuditLog.created_at < today).scalar()
+        if oldest is None:
+            break
+
+        day = day_start(oldest)
+        in_day = (AuditLog.created_at >= day) & (AuditLog.created_at < day + timedelta(days=1))
+        partition = partition_table(partition_name(day))
+        db.session.rollback()
+        partition.create(db.engine, checkfirst=True)
+        try:
+            copied = db.session.execute(partition.insert().from_select(
+                columns, select(*[AuditLog.__table__.c[name] for name in columns]).where(in_day)
+            )).rowcount
+            db.session.execute(AuditLog.__table__.delete().where(in_day))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            logger.info(f"[Audit] {partition.name} is being rotated by another worker")
+            break
+        moved += copied
+        logger.info(f"[Audit] Moved {copied} events into {partition.name}")
+    return moved
+
+def expire_partitions(now: datetime = None, retention_days: int = AUDIT_RETENTION_DAYS,
+                      rollup_retention_days: int = AUDIT_ROLLUP_RETENTION_DAYS) -> Dict[str, int]:
+    """Drop day partitions and rollups older than their retention periods"""
+    today = day_start(now or datetime.utcnow())
+    cutoff = today - timedelta(days=retention_days)
+    dropped = 0
+    for day, name in sorted(list_partitions().items()):
+        if day < cutoff:
+            partition_table(name).drop(db.engine, checkfirst=True)
+            dropped += 1
+            logger.info(f"[Audit] Dropped expired partition {name}")
+
+    rollups = AuditRollup.query.filter(
+        AuditRollup.hour < today - timedelta(days=rollup_retention_days)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return {'partitions_dropped': dropped, 'rollups_deleted': rollups}
+
+def run_maintenance(app) -> Dict[str, int]:
+    """Rotate and expire audit partitions; registered as a job queue maintenance task"""
+    with app.app_context():
+        rows_moved = rotate_partitions()
+        return dict(expire_partitions(), rows_moved=rows_moved)
+
+def rollup_summary(hours: int = 24, top: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Request counts for the admin charts, read from the hourly rollups
+
+    Returns:
+        Dict with per-hour totals, top endpoints, status codes and top users
+    """
+    since = hour_start(datetime.utcnow()) - timedelta(hours=hours - 1)
+    requests = db.session.query(AuditRollup).filter(
+        AuditRollup.event_type == 'request_complete',
+        AuditRollup.hour >= since
+    )
+    total = func.sum(AuditRollup.count).label('total')
+
+    def grouped(column, limit=None):
+        query = requests.with_entities(column, total).group_by(column)
+        query = query.order_by(total.desc()).limit(limit) if limit else query.order_by(column)
+        return query.all()
+
+    return {
+        'hourly': [{'hour': hour.isoformat(), 'count': count} for hour, count in grouped(AuditRollup.hour)],
+        'endpoints': [{'endpoint': endpoint or '(none)', 'count': count}
+                      for endpoint, count in grouped(AuditRollup.endpoint, top)],
+        'statuses': [{'status_code': status, 'count': count} for status, count in grouped(AuditRollup.status_code)],
+        'users': [{'user_id': user_id or None, 'count': count} for user_id, count in grouped(AuditRollup.user_id, top)]
+    }
@@ -0,0 +1,223 @@
+import os
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from threading import Lock
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Response cache settings (override via environment)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+# Path to a SQLite file shared by all workers; empty disables the persistent tier
+RESPONSE_CACHE_DB = os.environ.get("RESPONSE_CACHE_DB", "")
+RESPONSE_CACHE_DB_MAX_ROWS = int(os.environ.get("RESPONSE_CACHE_DB_MAX_ROWS", "50000"))
+
+_MISSING = object()
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+class LRUTTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = Lock()
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.stats.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats.hits + self.stats.misses
+            return dict(asdict(self.stats),
+                        size=len(self._entries),
+                        max_size=self.max_size,
+                        hit_rate=self.stats.hits / lookups if lookups else 0.0)
+
+class SQLiteCacheTier:
+    """Persistent cache tier in a SQLite file that every gunicorn worker can read"""
+
+    def __init__(self, path: str, ttl: float, max_rows: int = RESPONSE_CACHE_DB_MAX_ROWS):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_expires_at ON response_cache (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per forked process)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        if row[1] < time.time():
+            with self._connect() as conn:
+                conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl)
+            )
+
+    def prune(self) -> int:
+        """Delete expired rows, then the soonest-expiring ones beyond max_rows"""
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            # Every row has the same TTL, so the soonest to expire are the least recently written
+            deleted += conn.execute("""
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_rows,)).rowcount
+            return deleted
+
+class ResponseCache:
+    """Two-tier cache for LLM responses: in-process LRU in front of an optional SQLite tier"""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 db_path: str = RESPONSE_CACHE_DB):
+        self.memory = LRUTTLCache(max_size, ttl)
+        self.persistent: Optional[SQLiteCacheTier] = None
+        self.persistent_hits = 0
+        self.persistent_errors = 0
+        if db_path:
+            try:
+                self.persistent = SQLiteCacheTier(db_path, ttl)
+            except Exception as e:
+                logger.error(f"Persistent response cache disabled: {str(e)}")
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        # "I have a headache!" and "i have  a headache" share an entry
+        text = re.sub(r"\s+", " ", prompt.strip().lower())
+        return text.rstrip(" .!?")
+
+    @classmethod
+    def make_key(cls, prompt: str, model: str, temperature: float, system_prompt: str) -> str:
+        system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        raw = "\x1f".join([cls.normalize_prompt(prompt), model, f"{temperature:.3f}", system_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = self.persistent.get(key)
+        except Exception as e:
+            self.persistent_errors += 1
+            logger.error(f"Error reading persistent response cache: {str(e)}")
+            return None
+        if value is not None:
+            self.persistent_hits += 1
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value)
+            except Exception as e:
+                self.persistent_errors += 1
+                logger.error(f"Error writing persistent response cache: {str(e)}")
+
+    def prune(self) -> int:
+        """Bound the persistent tier; registered as a job queue maintenance task"""
+        if self.persistent is None:
+            return 0
+        try:
+            deleted = self.persistent.prune()
+        except Exception as e:
+            self.persistent_errors += 1
+            logger.error(f"Error pruning persistent response cache: {str(e)}")
+            return 0
+        if deleted:
+            logger.info(f"[Cache] Pruned {deleted} persistent response cache entries")
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.memory.get_stats()
+        # A memory miss that the persistent tier answered is still a cache hit
+        stats["persistent_enabled"] = self.persistent is not None
+        stats["persistent_hits"] = self.persistent_hits
+        stats["persistent_errors"] = self.persistent_errors
+        stats["total_hits"] = stats["hits"] + self.persistent_hits
+        stats["total_misses"] = stats["misses"] - self.persistent_hits
+        lookups = stats["total_hits"] + stats["total_misses"]
+        stats["total_hit_rate"] = stats["total_hits"] / lookups if lookups else 0.0
+        return stats
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import logging
+import multiprocessing
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from sqlalchemy import create_engine, text, and_, or_
+from sqlalchemy.engine import make_url
+
+from app import app, db
+from models import ChatMessage, ChatSession, HealthLog, AuditLog, SymptomStat
+from triage import triage_text
+from routes import append_helpline_info
+from reprocess import reprocess_voice_message
+from database import benchmark_writes, create_tuned_engine, is_sqlite
+from symptom_stats import rebuild_symptom_stats, endpoint_log_query
+from analytics import (export_logs_query, export_messages_query, export_sessions_query,
+                       symptom_stats_query, user_message_count_query)
+from audit_retention import rotate_partitions, expire_partitions, AUDIT_RETENTION_DAYS, AUDIT_ROLLUP_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPROCESS_CHECKPOINT = os.path.join(app.instance_path, "reprocess_voice.json")
+
+def load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def apply_reprocess_result(message: ChatMessage, result: dict, reanalyze: bool):
+    """Store a re-transcription (and regenerated reply) on a voice message"""
+    message.content = result["transcript"]
+    if not reanalyze:
+        return
+
+    health_analysis = triage_text(result["transcript"])
+    severity_level = health_analysis["severity"]
+    ai_response = append_helpline_info(result["ai_response"], severity_level, health_analysis["emergency"])
+
+    # The reply is the next message in the session, if the assistant answered
+    next_message = ChatMessage.query.filter(
+        ChatMessage.session_id == message.session_id,
+        ChatMessage.id > message.id
+    ).order_by(ChatMessage.id).first()
+
+    if next_message and not next_message.is_user:
+        next_message.content = ai_response
+        next_message.health_analysis = str(health_analysis)
+        next_message.severity_level = severity_level
+    else:
+        db.session.add(ChatMessage(
+            session_id=message.session_id,
+            is_user=False,
+            content=ai_response,
+            message_type='text',
+            health_analysis=str(health_analysis),
+            severity_level=severity_level
+        ))
+
+@app.cli.command("reprocess-voice")
+@click.option("--batch-size", default=50, show_default=True, help="Voice messages fetched per keyset page.")
+@click.option("--workers", default=2, show_default=True, help="Worker processes transcribing in parallel.")
+@click.option("--reanalyze", is_flag=True, help="Also regenerate the AI reply to each message.")
+@click.option("--checkpoint", default=DEFAULT_REPROCESS_CHECKPOINT, show_default=True,
+              help="File recording the last processed message id.")
+@click.option("--restart", is_flag=True, help="Ignore any existing checkpoint and start from the beginning.")
+@click.option("--limit", default=0, help="Stop after this many messages (0 for no limit).")
+def reprocess_voice(batch_size, workers, reanalyze, checkpoint, restart, limit):
+    """Re-transcribe stored voice messages, resuming from the last checkpoint."""
+    state = {} if restart else load_checkpoint(checkpoint)
+    last_id = state.get("last_id", 0)
+    totals = {key: state.get(key, 0) for key in ("processed", "updated", "failed")}
+    if last_id:
+        click.echo(f"Resuming after message {last_id} ({totals['processed']} already processed)")
+
+    task = partial(reprocess_voice_message, reanalyze=reanalyze)
+    run_started = time.time()
+    run_processed = 0
+
+    # Spawned workers import only the audio/LLM services, never the app or its job threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        while not limit or run_processed < limit:
+            page_size = min(batch_size, limit - run_processed) if limit else batch_size
+            page = db.session.query(ChatMessage.id, ChatMessage.audio_path).filter(
+                ChatMessage.audio_path.isnot(None),
+                ChatMessage.id > last_id
+            ).order_by(ChatMessage.id).limit(page_size).all()
+            if not page:
+                break
+
+            batch_started = time.time()
+            results = list(executor.map(task, [row.id for row in page], [row.audio_path for row in page]))
+
+            for result in results:
+                if "error" in result:
+                    totals["failed"] += 1
+                    logger.warning(f"Voice message {result['id']} not reprocessed: {result['error']}")
+                    continue
+                message = db.session.get(ChatMessage, result["id"])
+                if message:
+                    apply_reprocess_result(message, result, reanalyze)
+                    totals["updated"] += 1
+            db.session.commit()
+
+            last_id = page[-1].id
+            totals["processed"] += len(page)
+            run_processed += len(page)
+            save_checkpoint(checkpoint, dict(totals, last_id=last_id))
+
+            elapsed = time.time() - batch_started
+            click.echo(f"Processed {len(page)} messages up to id {last_id} in {elapsed:.1f}s "
+                       f"({len(page) / elapsed:.2f} msg/s)")
+
+    elapsed = time.time() - run_started
+    rate = run_processed / elapsed if elapsed else 0.0
+    click.echo(f"Done: {run_processed} messages in {elapsed:.1f}s ({rate:.2f} msg/s); "
+               f"{totals['updated']} updated, {totals['failed']} failed in total")
+
+# Hot queries issued by each route and the index that must serve them
+HOT_QUERIES = [
+    ("dashboard: session sidebar page", "ix_chat_sessions_user_id_created_at",
+     lambda: ChatSession.query.filter_by(user_id=1).order_by(
+         ChatSession.created_at.desc(), ChatSession.id.desc()).limit(31)),
+    ("dashboard: older messages page", "ix_chat_messages_session_id_created_at",
+     lambda: ChatMessage.query.filter_by(session_id=1).filter(or_(
+         ChatMessage.created_at < datetime(2024, 1, 1),
+         and_(ChatMessage.created_at == datetime(2024, 1, 1), ChatMessage.id < 100)
+     )).order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(31)),
+    ("export_data: health logs", "ix_health_logs_user_id_recorded_at",
+     lambda: export_logs_query(1)),
+    ("export_data: sessions", "ix_chat_sessions_user_id_id",
+     lambda: export_sessions_query(1)),
+    ("export_data: session messages", "ix_chat_messages_session_id_created_at",
+     lambda: export_messages_query(1)),
+    ("health_analytics_data: message count", "ix_chat_messages_session_id_created_at",
+     lambda: user_message_count_query(1)),
+    ("health_analytics_data: symptom statistics", "uq_symptom_stats_user_symptom",
+     lambda: symptom_stats_query(1).order_by(SymptomStat.symptom_key)),
+    ("health_journal: logs", "ix_health_logs_user_id_recorded_at",
+     lambda: HealthLog.query.filter_by(user_id=1).order_by(HealthLog.recorded_at.desc())),
+    ("delete_health_log: symptom statistics row", "uq_symptom_stats_user_symptom",
+     lambda: SymptomStat.query.filter_by(user_id=1, symptom_key="headache").limit(1)),
+    ("delete_health_log: new first/last symptom log", "ix_health_logs_user_id_recorded_at",
+     lambda: endpoint_log_query(1, "headache", 1, last=True).limit(1)),
+    ("visual_symptom_analysis: recent logs", "ix_health_logs_user_id_recorded_at",
+     lambda: HealthLog.query.filter_by(user_id=1).order_by(HealthLog.recorded_at.desc()).limit(5)),
+    ("admin_dashboard: audit logs", "ix_audit_logs_created_at",
+     lambda: AuditLog.query.order_by(AuditLog.created_at.desc()).limit(100)),
+]
+
+def explain(query) -> str:
+    """Return the database's query plan for an ORM query as text"""
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    with db.engine.connect() as conn:
+        if dialect.name == "sqlite":
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+            return "\n".join(row[-1] for row in rows)
+        # Small tables would otherwise be sequentially scanned regardless of indexes
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+        return "\n".join(row[0] for row in rows)
+
+@app.cli.command("check-query-plans")
+@click.option("--verbose", is_flag=True, help="Print the full plan for every query.")
+def check_query_plans(verbose):
+    """Verify that each hot route query is served by its composite index."""
+    failures = 0
+    for route, index_name, build_query in HOT_QUERIES:
+        plan = explain(build_query())
+        # The index must be used, and SQLite must not need a separate sort step
+        ok = index_name in plan and "TEMP B-TREE" not in plan
+        failures += not ok
+        click.echo(f"{'OK  ' if ok else 'FAIL'} {route} -> {index_name}")
+        if verbose or not ok:
+            click.echo("     " + plan.replace("\n", "\n     "))
+
+    if failures:
+        raise click.ClickException(f"{failures} queries are not using their indexes")
+
+@app.cli.command("benchmark-db-writes")
+@click.option("--url", "urls", multiple=True,
+              help="Database URL to benchmark (repeatable). Defaults to the configured database.")
+@click.option("--threads", default=8, show_default=True, help="Concurrent writers.")
+@click.option("--writes", default=200, show_default=True, help="Committed inserts per writer.")
+def benchmark_db_writes(urls, threads, writes):
+    """Compare concurrent-write throughput with stock and tuned engine settings."""
+    for url in urls or [app.config["SQLALCHEMY_DATABASE_URI"]]:
+        for mode in ("stock", "tuned"):
+            target = url
+            if is_sqlite(url):
+                # SQLite runs on scratch files next to the database, since WAL mode persists in the file
+                path = make_url(url).database
+                target = f"sqlite:///{os.path.splitext(path)[0]}-benchmark-{mode}.db"
+            engine = create_tuned_engine(target) if mode == "tuned" else create_engine(target)
+            try:
+                result = benchmark_writes(engine, threads, writes)
+            finally:
+                if is_sqlite(target):
+                    for suffix in ("", "-wal", "-shm"):
+                        path = make_url(target).database + suffix
+                        if os.path.exists(path):
+                            os.remove(path)
+
+            click.echo(f"{make_url(url).get_backend_name():<10} {mode:<6} "
+                       f"{result['written']:>6} writes in {result['elapsed']:.2f}s "
+                       f"({result['writes_per_second']:.0f}/s), {result['failed']} failed")
+            if result["first_error"]:
+                click.echo(f"           first error: {result['first_error']}")
+
+@app.cli.command("audit-maintenance")
+@click.option("--retention-days", default=AUDIT_RETENTION_DAYS, show_default=True,
+              help="Drop raw audit partitions older than this many days.")
+@click.option("--rollup-retention-days", default=AUDIT_ROLLUP_RETENTION_DAYS, show_default=True,
+              help="Delete hourly rollups older than this many days.")
+def audit_maintenance(retention_days, rollup_retention_days):
+    """Move finished days of audit_logs into day partitions and expire old ones."""
+    moved = rotate_partitions()
+    expired = expire_partitions(retention_days=retention_days, rollup_retention_days=rollup_retention_days)
+    click.echo(f"Moved {moved} audit events into day partitions; dropped {expired['partitions_dropped']} "
+               f"partitions and {expired['rollups_deleted']} hourly rollups")
+
+@app.cli.command("rebuild-symptom-stats")
+@click.option("--user-id", type=int, default=None, help="Only reconcile this user's statistics.")
+@click.option("--dry-run", is_flag=True, help="Report differences without writing them.")
+def rebuild_symptom_stats_command(user_id, dry_run):
+    """Recompute symptom_stats from health logs and repair any rows that drifted."""
+    result = rebuild_symptom_stats(user_id=user_id, dry_run=dry_run)
+    verb = "Would fix" if dry_run else "Fixed"
+    click.echo(f"Checked {result['checked']} symptom rows. {verb}: {result['inserted']} missing, "
+               f"{result['updated']} wrong, {result['deleted']} orphaned")
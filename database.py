@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, func, select
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+# Default database: a SQLite file under the working directory's instance folder
+DEFAULT_SQLITE_PATH = os.path.join(os.getcwd(), 'instance', 'health_app.db')
+
+# SQLite tuning (override via environment)
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "20000"))
+
+# PostgreSQL connection pool (override via environment)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+def database_url() -> str:
+    """DATABASE_URL if set, otherwise the local SQLite file"""
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        os.makedirs(os.path.dirname(DEFAULT_SQLITE_PATH), exist_ok=True)
+        return f"sqlite:///{DEFAULT_SQLITE_PATH}"
+    # Hosting providers still hand out the scheme SQLAlchemy 1.4 dropped
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine() keyword arguments for the database behind url"""
+    if is_sqlite(url):
+        # Pragmas are applied per connection by install_sqlite_pragmas
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL only syncs at checkpoints
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+    # SQLite's lower() only folds ASCII; match Python and PostgreSQL for other letters
+    dbapi_connection.create_function("lower", 1, lambda value: value.lower() if isinstance(value, str) else value,
+                                     deterministic=True)
+
+def install_sqlite_pragmas(engine: Engine):
+    """Tune every new connection of a SQLite engine; a no-op for other databases"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+
+def create_tuned_engine(url: str) -> Engine:
+    """Engine configured the same way as the application's"""
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_pragmas(engine)
+    return engine
+
+# Scratch table written by benchmark_writes and dropped afterwards
+benchmark_metadata = MetaData()
+benchmark_table = Table(
+    "benchmark_writes", benchmark_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("worker", Integer),
+    Column("payload", String(255)),
+)
+
+def benchmark_writes(engine: Engine, threads: int, writes: int) -> Dict[str, Any]:
+    """
+    Measure concurrent single-row write throughput
+
+    Each thread inserts `writes` rows into a scratch table, committing every
+    row the way a request commits its audit log entry. Writes that fail
+    (e.g. "database is locked") are counted, not retried.
+    """
+    benchmark_metadata.drop_all(engine, checkfirst=True)
+    benchmark_metadata.create_all(engine)
+
+    errors: List[str] = []
+    start_barrier = threading.Barrier(threads)
+
+    def worker(worker_id: int):
+        start_barrier.wait()
+        for i in range(writes):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(benchmark_table.insert().values(
+                        worker=worker_id, payload=f"event {i} from worker {worker_id}"))
+            except Exception as e:
+                errors.append(str(e).splitlines()[0])
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - started
+
+    with engine.connect() as conn:
+        written = conn.execute(select(func.count()).select_from(benchmark_table)).scalar()
+    benchmark_metadata.drop_all(engine)
+    engine.dispose()
+
+    return {
+        "written": written,
+        "failed": len(errors),
+        "elapsed": elapsed,
+        "writes_per_second": written / elapsed if elapsed else 0.0,
+        "first_error": errors[0] if errors else None,
+    }
@@ -1,10 +1,16 @@
 import os
-import base64
+import json
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List, Union
+from threading import Lock, Thread
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Union, Tuple
 
 import google.generativeai as genai
 
+from resilience import gemini_guard
+from image_processing import preprocess_image, IMAGE_MAX_EDGE, IMAGE_JPEG_QUALITY
+
 logger = logging.getLogger(__name__)
 
 # Configure the Gemini API
@@ -15,23 +21,43 @@ if GEMINI_API_KEY:
 # Default model to use for image analysis
 DEFAULT_MODEL = "gemini-1.5-flash"
 
-def analyze_image_with_history(base64_image: str, symptom_history: List[Dict] = None) -> Dict[str, Any]:
-    """
-    Analyze a medical image with historical context using Gemini Vision
-    """
-    if not GEMINI_API_KEY:
-        return {"error": "API key not found"}
-    
-    try:
-        image_data = base64.b64decode(base64_image)
-        
-        # Build context from history
-        history_context = ""
-        if symptom_history:
-            history_context = "Previous symptoms and images:\n" + \
-                            "\n".join([f"- {h['date']}: {h['description']}" for h in symptom_history])
-        
-        prompt = f"""
+# Generation settings for plain image analysis and analysis with history
+IMAGE_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 800,
+}
+HISTORY_GENERATION_CONFIG = dict(IMAGE_GENERATION_CONFIG, max_output_tokens=1000)
+
+# Prompt for medical image analysis
+IMAGE_ANALYSIS_PROMPT = """
+        Analyze this medical image in detail and describe what you observe. 
+        If you see any potential health concerns, describe them objectively.
+        Focus on visible symptoms or conditions that might be present.
+        Do not make definitive diagnoses, but you can mention possible conditions
+        that a healthcare professional might want to evaluate further.
+        If the image appears to show a serious medical condition, note that.
+        """
+
+ANALYSIS_UNAVAILABLE = "Image analysis is unavailable. API key not configured."
+ANALYSIS_FAILED_PREFIX = "I couldn't analyze the image due to a technical issue"
+
+def prompt_version(prompt: str, generation_config: Dict[str, Any], model_name: str = DEFAULT_MODEL) -> str:
+    """Fingerprint of everything besides the uploaded bytes that determines an analysis"""
+    # Images are downscaled and re-encoded before analysis, so those settings count too
+    preprocessing = {"max_edge": IMAGE_MAX_EDGE, "jpeg_quality": IMAGE_JPEG_QUALITY}
+    raw = json.dumps([model_name, sorted(generation_config.items()), prompt, sorted(preprocessing.items())])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def build_history_prompt(symptom_history: List[Dict] = None) -> str:
+    """Build the analysis prompt including the user's recent symptom history"""
+    history_context = ""
+    if symptom_history:
+        history_context = "Previous symptoms and images:\n" + \
+                        "\n".join([f"- {h['date']}: {h['description']}" for h in symptom_history])
+
+    return f"""
         Analyze this medical image in detail:
         1. Identify visible symptoms and characteristics
         2. Compare with previous records if available
@@ -44,25 +70,79 @@ def analyze_image_with_history(base64_image: str, symptom_history: List[Dict] =
         
         Provide structured analysis in medical terminology.
         """
+
+IMAGE_PROMPT_VERSION = prompt_version(IMAGE_ANALYSIS_PROMPT, IMAGE_GENERATION_CONFIG)
+
+def history_prompt_version(symptom_history: List[Dict] = None) -> str:
+    """Prompt version for an analysis with the given symptom history"""
+    return prompt_version(build_history_prompt(symptom_history), HISTORY_GENERATION_CONFIG)
+
+def is_failed_analysis(result: Union[str, Dict[str, Any]]) -> bool:
+    """True for the fallback values returned when analysis could not run"""
+    if isinstance(result, dict):
+        return "error" in result
+    return result == ANALYSIS_UNAVAILABLE or result.startswith(ANALYSIS_FAILED_PREFIX)
+
+# Model registry: one GenerativeModel per (model name, generation config)
+_models: Dict[Tuple, "genai.GenerativeModel"] = {}
+_models_lock = Lock()
+
+def get_model(model_name: str = DEFAULT_MODEL, generation_config: Dict[str, Any] = None) -> "genai.GenerativeModel":
+    """Return a cached GenerativeModel, creating it on first use"""
+    generation_config = generation_config or {}
+    key = (model_name, tuple(sorted(generation_config.items())))
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config
+                )
+                _models[key] = model
+    return model
+
+def warm_up(background: bool = True):
+    """Build the default models and open the API connection before the first request"""
+    if not GEMINI_API_KEY:
+        return
+
+    def _warm():
+        try:
+            get_model(DEFAULT_MODEL, HISTORY_GENERATION_CONFIG)
+            model = get_model(DEFAULT_MODEL, IMAGE_GENERATION_CONFIG)
+            model.count_tokens("warm-up")
+            logger.info("Gemini models warmed up")
+        except Exception as e:
+            logger.warning(f"Gemini warm-up failed: {str(e)}")
+
+    if background:
+        Thread(target=_warm, name="gemini-warmup", daemon=True).start()
+    else:
+        _warm()
+
+def analyze_image_with_history(image_data: bytes, symptom_history: List[Dict] = None) -> Dict[str, Any]:
+    """
+    Analyze a medical image with historical context using Gemini Vision
+    """
+    if not GEMINI_API_KEY:
+        return {"error": "API key not found"}
+    
+    try:
+        # Downscale and re-encode before upload
+        image_data, mime_type = preprocess_image(image_data)
         
-        generation_config = {
-            "temperature": 0.4,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1000,
-        }
+        prompt = build_history_prompt(symptom_history)
         
-        model = genai.GenerativeModel(
-            model_name=DEFAULT_MODEL,
-            generation_config=generation_config
-        )
+        model = get_model(DEFAULT_MODEL, HISTORY_GENERATION_CONFIG)
         
         content_parts = [
             prompt,
-            {"mime_type": "image/jpeg", "data": image_data}
+            {"mime_type": mime_type, "data": image_data}
         ]
         
-        response = model.generate_content(content_parts)
+        response = gemini_guard.call(lambda: model.generate_content(content_parts))
         
         # Structure the response
         analysis = {
@@ -88,59 +168,39 @@ def extract_medical_terms(text: str) -> List[str]:
     ]
     return [term for term in common_terms if term.lower() in text.lower()]
 
-def analyze_image(base64_image: str) -> str:
+def analyze_image(image_data: bytes) -> str:
     """
     Analyze a medical image using Google's Gemini Vision capabilities
     
     Args:
-        base64_image: Base64 encoded image
+        image_data: Raw image bytes
     
     Returns:
         Analysis result
     """
     if not GEMINI_API_KEY:
         logger.warning("GEMINI_API_KEY not found in environment variables")
-        return "Image analysis is unavailable. API key not configured."
+        return ANALYSIS_UNAVAILABLE
     
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(base64_image)
-        
-        # Configure Gemini model
-        generation_config = {
-            "temperature": 0.4,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 800,
-        }
+        # Downscale and re-encode before upload
+        image_data, mime_type = preprocess_image(image_data)
         
-        model = genai.GenerativeModel(
-            model_name=DEFAULT_MODEL,
-            generation_config=generation_config
-        )
-        
-        # Create prompt for medical image analysis
-        prompt = """
-        Analyze this medical image in detail and describe what you observe. 
-        If you see any potential health concerns, describe them objectively.
-        Focus on visible symptoms or conditions that might be present.
-        Do not make definitive diagnoses, but you can mention possible conditions
-        that a healthcare professional might want to evaluate further.
-        If the image appears to show a serious medical condition, note that.
-        """
+        # Reuse the cached Gemini model
+        model = get_model(DEFAULT_MODEL, IMAGE_GENERATION_CONFIG)
         
         # Prepare content parts (text prompt and image)
         content_parts = [
-            prompt,
-            {"mime_type": "image/jpeg", "data": image_data}
+            IMAGE_ANALYSIS_PROMPT,
+            {"mime_type": mime_type, "data": image_data}
         ]
         
         # Generate response from Gemini
-        response = model.generate_content(content_parts)
+        response = gemini_guard.call(lambda: model.generate_content(content_parts))
         
         # Return the text response
         return response.text
     
     except Exception as e:
         logger.error(f"Error calling Gemini API: {str(e)}")
-        return f"I couldn't analyze the image due to a technical issue: {str(e)}"
\ No newline at end of file
+        return f"{ANALYSIS_FAILED_PREFIX}: {str(e)}"
\ No newline at end of file
@@ -2,7 +2,7 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 import datetime
 
 # Get API key from environment
@@ -10,7 +10,9 @@ GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 if not GROQ_API_KEY:
     logging.warning("GROQ_API_KEY not found in environment variables")
 
-import requests
+from http_client import http_client
+from cache import response_cache
+from resilience import groq_guard
 
 logger = logging.getLogger(__name__)
 
@@ -19,29 +21,9 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
 # Default model to use
 DEFAULT_MODEL = "llama3-8b-8192"
+HEALTH_TEMPERATURE = 0.3
 
-def track_performance(func):
-    """Decorator to track function performance"""
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        try:
-            result = func(*args, **kwargs)
-            duration = (time.time() - start_time) * 1000  # Convert to ms
-            logger.info(f"[Performance] {func.__name__}: {duration:.2f}ms")
-            return result
-        except Exception as e:
-            duration = (time.time() - start_time) * 1000
-            logger.error(f"[Performance] {func.__name__} failed after {duration:.2f}ms: {str(e)}")
-            raise
-    return wrapper
-
-@track_performance
-def generate_health_response(prompt: str) -> str:
-    """Generate a health-related response using Groq API"""
-    if not GROQ_API_KEY:
-        return "I'm sorry, I'm not able to process your request at the moment. Please try again later."
-
-    system_message = """You are HealthCompanion, an advanced AI health assistant with the tone and approach of an experienced, empathetic physician.
+HEALTH_SYSTEM_PROMPT = """You are HealthCompanion, an advanced AI health assistant with the tone and approach of an experienced, empathetic physician.
 
     Your role is to:
     1. Provide factual health information based on current medical knowledge and evidence-based medicine
@@ -69,31 +51,118 @@ def generate_health_response(prompt: str) -> str:
     CRITICAL: Your responses should sound like they come from a qualified, experienced physician who is both knowledgeable and compassionate.
     """
 
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {GROQ_API_KEY}"
-        }
+FALLBACK_RESPONSE = "I apologize, but I encountered an error processing your request. Please try again."
+UNAVAILABLE_RESPONSE = "I'm sorry, I'm not able to process your request at the moment. Please try again later."
 
-        data = {
-            "model": DEFAULT_MODEL,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 800
-        }
+def track_performance(func):
+    """Decorator to track function performance"""
+    def wrapper(*args, **kwargs):
+        start_time = time.time()
+        try:
+            result = func(*args, **kwargs)
+            duration = (time.time() - start_time) * 1000  # Convert to ms
+            logger.info(f"[Performance] {func.__name__}: {duration:.2f}ms")
+            return result
+        except Exception as e:
+            duration = (time.time() - start_time) * 1000
+            logger.error(f"[Performance] {func.__name__} failed after {duration:.2f}ms: {str(e)}")
+            raise
+    return wrapper
+
+def _groq_headers() -> Dict[str, str]:
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {GROQ_API_KEY}"
+    }
+
+def _health_request_data(prompt: str, stream: bool = False) -> Dict[str, Any]:
+    data = {
+        "model": DEFAULT_MODEL,
+        "messages": [
+            {"role": "system", "content": HEALTH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": HEALTH_TEMPERATURE,
+        "max_tokens": 800
+    }
+    if stream:
+        data["stream"] = True
+    return data
+
+def _health_cache_key(prompt: str) -> str:
+    return response_cache.make_key(prompt, DEFAULT_MODEL, HEALTH_TEMPERATURE, HEALTH_SYSTEM_PROMPT)
 
-        response = requests.post(GROQ_API_URL, headers=headers, json=data)
+@track_performance
+def generate_health_response(prompt: str) -> str:
+    """Generate a health-related response using Groq API"""
+    if not GROQ_API_KEY:
+        return UNAVAILABLE_RESPONSE
+
+    cache_key = _health_cache_key(prompt)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        response = groq_guard.call(lambda: http_client.post(
+            GROQ_API_URL, name="groq.generate_health_response",
+            headers=_groq_headers(), json=_health_request_data(prompt)))
         response.raise_for_status()
 
         result = response.json()
-        return result["choices"][0]["message"]["content"]
+        content = result["choices"][0]["message"]["content"]
+        response_cache.set(cache_key, content)
+        return content
 
     except Exception as e:
         logger.error(f"Error in generate_health_response: {str(e)}")
-        return "I apologize, but I encountered an error processing your request. Please try again."
+        return FALLBACK_RESPONSE
+
+def stream_health_response(prompt: str) -> Iterator[str]:
+    """Stream a health-related response from Groq API token by token"""
+    if not GROQ_API_KEY:
+        yield UNAVAILABLE_RESPONSE
+        return
+
+    cache_key = _health_cache_key(prompt)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    response = None
+    chunks = []
+    try:
+        # Retries only cover the request itself; once tokens flow the stream is not replayed
+        response = groq_guard.call(lambda: http_client.post(
+            GROQ_API_URL, name="groq.stream_health_response",
+            headers=_groq_headers(), json=_health_request_data(prompt, stream=True), stream=True))
+        response.raise_for_status()
+
+        # Groq relays OpenAI-style server-sent events: "data: {...}" lines ending with "data: [DONE]"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+            if delta:
+                chunks.append(delta)
+                yield delta
+        else:
+            # Only cache streams that ran to completion
+            chunks = []
+
+        if chunks:
+            response_cache.set(cache_key, "".join(chunks))
+
+    except Exception as e:
+        logger.error(f"Error in stream_health_response: {str(e)}")
+        yield ("\n\n" if chunks else "") + FALLBACK_RESPONSE
+    finally:
+        if response is not None:
+            response.close()
 
 def analyze_symptoms_patterns(logs_data: List[Dict]) -> Dict[str, Any]:
     """Analyze patterns in health logs"""
@@ -154,7 +223,8 @@ def analyze_symptoms_patterns(logs_data: List[Dict]) -> Dict[str, Any]:
             "temperature": 0.3
         }
 
-        response = requests.post(GROQ_API_URL, headers=headers, json=data)
+        response = groq_guard.call(lambda: http_client.post(
+            GROQ_API_URL, name="groq.analyze_symptoms_patterns", headers=headers, json=data))
         response.raise_for_status()
 
         analysis = response.json()["choices"][0]["message"]["content"]
@@ -182,39 +252,3 @@ def analyze_symptoms_patterns(logs_data: List[Dict]) -> Dict[str, Any]:
             "correlations": ["No correlations found"],
             "recommendations": ["Unable to analyze patterns. Please try again."]
         }
-
-
-
-def analyze_health_question(prompt: str) -> Dict[str, Any]:
-    """Analyze a health question to determine severity and key medical concepts"""
-    if not GROQ_API_KEY:
-        return {"severity": 0, "keywords": [], "error": "API key not found"}
-
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {GROQ_API_KEY}"
-        }
-
-        data = {
-            "model": DEFAULT_MODEL,
-            "messages": [
-                {"role": "system", "content": "You are a medical analyzer. Analyze the health query for severity and key medical concepts."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.1
-        }
-
-        response = requests.post(GROQ_API_URL, headers=headers, json=data)
-        response.raise_for_status()
-
-        analysis = response.json()["choices"][0]["message"]["content"]
-        return {
-            "severity": 1,  # Default moderate severity
-            "keywords": [prompt],  # Basic keyword extraction
-            "analysis": analysis
-        }
-
-    except Exception as e:
-        logger.error(f"Error in analyze_health_question: {str(e)}")
-        return {"severity": 0, "keywords": [], "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+from threading import Lock
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Pool and timeout settings (override via environment)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+
+@dataclass
+class CallStats:
+    count: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+class HTTPClient:
+    """Shared keep-alive HTTP client with connection pooling, timeouts and latency stats"""
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self._lock = Lock()
+        self._session: Optional[requests.Session] = None
+        self._session_pid: Optional[int] = None
+        self._stats: Dict[str, CallStats] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        # Sockets must not be shared across forked gunicorn workers,
+        # so each process builds its own pool on first use
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size,
+                                          pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def request(self, method: str, url: str, name: str = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        name = name or url
+        start_time = time.time()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            self._record(name, (time.time() - start_time) * 1000, failed)
+
+    def get(self, url: str, name: str = None, **kwargs) -> requests.Response:
+        return self.request("GET", url, name=name, **kwargs)
+
+    def post(self, url: str, name: str = None, **kwargs) -> requests.Response:
+        return self.request("POST", url, name=name, **kwargs)
+
+    def _record(self, name: str, duration: float, failed: bool):
+        with self._lock:
+            stats = self._stats.setdefault(name, CallStats())
+            stats.count += 1
+            stats.total_ms += duration
+            stats.last_ms = duration
+            stats.max_ms = max(stats.max_ms, duration)
+            if failed:
+                stats.errors += 1
+        logger.debug(f"[HTTP] {name}: {duration:.2f}ms{' (failed)' if failed else ''}")
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(asdict(stats), avg_ms=stats.avg_ms)
+                    for name, stats in self._stats.items()}
+
+# Global HTTP client instance
+http_client = HTTPClient()
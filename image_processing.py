@@ -0,0 +1,80 @@
+import os
+import io
+import logging
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Preprocessing settings (override via environment)
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE", "1536"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+
+EXIF_ORIENTATION = 0x0112
+
+def preprocess_image(image_data: bytes, max_edge: int = IMAGE_MAX_EDGE,
+                     quality: int = IMAGE_JPEG_QUALITY) -> Tuple[bytes, str]:
+    """
+    Prepare an uploaded image for vision analysis
+
+    Decodes the image once, applies its EXIF orientation, downsizes it so
+    the longest edge is at most max_edge and re-encodes it as JPEG.
+
+    Args:
+        image_data: Raw uploaded image bytes
+        max_edge: Maximum width/height in pixels
+        quality: JPEG quality for the re-encoded image
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            source_format = image.format
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+
+            # Upright RGB JPEGs that already fit are sent as-is
+            if (source_format == "JPEG" and orientation == 1 and image.mode == "RGB"
+                    and max(image.size) <= max_edge):
+                return image_data, "image/jpeg"
+
+            # Animated GIFs are analyzed from their first frame
+            if getattr(image, "is_animated", False):
+                image.seek(0)
+
+            image = ImageOps.exif_transpose(image)
+
+            # Flatten transparency onto white; JPEG has no alpha channel
+            if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+
+            original_size = image.size
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+            processed = output.getvalue()
+
+        logger.info(f"Preprocessed {source_format} image {original_size} -> {image.size}, "
+                    f"{len(image_data)} -> {len(processed)} bytes")
+        return processed, "image/jpeg"
+
+    except Exception as e:
+        # Let the vision model try the original bytes rather than failing the upload
+        logger.error(f"Error preprocessing image: {str(e)}")
+        return image_data, _sniff_mime_type(image_data)
+
+def _sniff_mime_type(image_data: bytes) -> str:
+    if image_data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
@@ -0,0 +1,300 @@
+import os
+import time
+import json
+import uuid
+import sqlite3
+import logging
+import threading
+from threading import Event, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job queue settings (override via environment)
+JOB_QUEUE_DB = os.environ.get("JOB_QUEUE_DB", os.path.join(os.getcwd(), "instance", "jobs.db"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+# Running jobs refresh a heartbeat; one silent for JOB_STALE_SECONDS is assumed orphaned
+# by a crashed worker and requeued. Keep it well above the heartbeat interval and the
+# audio conversion and transcription timeouts.
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "600"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "86400"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "2"))
+# Recovery and maintenance tasks run at most once per interval across all processes
+JOB_MAINTENANCE_SECONDS = float(os.environ.get("JOB_MAINTENANCE_SECONDS", str(JOB_STALE_SECONDS / 2)))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED)
+
+class JobQueue:
+    """SQLite-backed job queue with an in-process worker pool
+
+    The queue file is shared by every gunicorn worker; jobs are claimed
+    inside an IMMEDIATE transaction so each one runs exactly once. Workers
+    start on the first request a process serves, so CLI commands that
+    import the app never claim jobs or run maintenance.
+    """
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+        self._maintenance: List[Callable[[], Any]] = []
+        self._local = threading.local()
+        self._wakeup = Event()
+        self._stop = Event()
+        self._threads: List[Thread] = []
+        self._app = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+        # Jobs running in this process: id -> started_at of our claim
+        self._running: Dict[str, float] = {}
+        self._running_lock = threading.Lock()
+        self._next_maintenance = 0.0
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_db(self):
+        if self._initialized:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id INTEGER,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )
+        """)
+        columns = [column["name"] for column in conn.execute("PRAGMA table_info(jobs)")]
+        if "heartbeat_at" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at ON jobs (status, created_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS maintenance (id INTEGER PRIMARY KEY, last_run REAL NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO maintenance (id, last_run) VALUES (1, 0)")
+        self._initialized = True
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        """Register the handler that processes jobs of the given kind"""
+        self._handlers[kind] = handler
+
+    def register_maintenance(self, task: Callable[[], Any]):
+        """Register a housekeeping task run periodically alongside job recovery"""
+        self._maintenance.append(task)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None) -> str:
+        """Queue a job and return its id"""
+        self._init_db()
+        job_id = str(uuid.uuid4())
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, user_id, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, json.dumps(payload), STATUS_QUEUED, time.time())
+        )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status, result and error"""
+        self._init_db()
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "user_id": row["user_id"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "finished_at": row["finished_at"]
+        }
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,)
+            ).fetchone()
+            job = None
+            if row:
+                # started_at identifies this claim, so a requeued job's old worker can't finish it
+                job = dict(row, started_at=time.time())
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (STATUS_RUNNING, job["started_at"], job["started_at"], job["id"])
+                )
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _finish(self, job: Dict[str, Any], status: str, result: Dict[str, Any] = None, error: str = None):
+        finished = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND started_at = ? AND status = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(),
+             job["id"], job["started_at"], STATUS_RUNNING)
+        ).rowcount
+        if not finished:
+            logger.warning(f"[Jobs] {job['kind']} {job['id']} was reclaimed while running; discarding its result")
+
+    def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            self._finish(job, STATUS_FAILED, error=f"No handler for job kind '{job['kind']}'")
+            return
+
+        start_time = time.time()
+        with self._running_lock:
+            self._running[job["id"]] = job["started_at"]
+        try:
+            with self._app.app_context():
+                result = handler(json.loads(job["payload"]))
+            self._finish(job, STATUS_DONE, result=result)
+            logger.info(f"[Jobs] {job['kind']} {job['id']} done in {(time.time() - start_time) * 1000:.2f}ms")
+        except Exception as e:
+            logger.error(f"[Jobs] {job['kind']} {job['id']} failed: {str(e)}")
+            self._finish(job, STATUS_FAILED, error=str(e))
+        finally:
+            with self._running_lock:
+                self._running.pop(job["id"], None)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            with self._running_lock:
+                running = list(self._running.items())
+            try:
+                conn = self._connect()
+                for job_id, started_at in running:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND started_at = ? AND status = ?",
+                        (time.time(), job_id, started_at, STATUS_RUNNING)
+                    )
+            except Exception as e:
+                logger.error(f"[Jobs] Heartbeat failed: {str(e)}")
+
+    def recover(self):
+        """Requeue running jobs whose worker stopped heartbeating and prune old finished ones"""
+        self._init_db()
+        now = time.time()
+        conn = self._connect()
+        stale = "COALESCE(heartbeat_at, started_at) < ?"
+        conn.execute(
+            f"UPDATE jobs SET status = ? WHERE status = ? AND {stale} AND attempts < ?",
+            (STATUS_QUEUED, STATUS_RUNNING, now - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)
+        )
+        conn.execute(
+            f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND {stale}",
+            (STATUS_FAILED, "Job abandoned by worker", now, STATUS_RUNNING, now - JOB_STALE_SECONDS)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (STATUS_DONE, STATUS_FAILED, now - JOB_RETENTION_SECONDS)
+        )
+
+    def _claim_maintenance(self) -> bool:
+        """Take the maintenance lease if the interval has passed; one worker across all processes wins"""
+        now = time.time()
+        with self._maintenance_lock:
+            # Only one thread per process asks jobs.db each interval
+            if now < self._next_maintenance:
+                return False
+            self._next_maintenance = now + JOB_MAINTENANCE_SECONDS
+        return self._connect().execute(
+            "UPDATE maintenance SET last_run = ? WHERE id = 1 AND last_run < ?",
+            (now, now - JOB_MAINTENANCE_SECONDS)
+        ).rowcount == 1
+
+    def _run_maintenance(self):
+        for task in self._maintenance:
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"[Jobs] Maintenance task failed: {str(e)}")
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._claim_maintenance():
+                    self.recover()
+                    self._run_maintenance()
+
+                job = self._claim()
+                if job is None:
+                    # Wake on local enqueue, or poll for jobs queued by other workers
+                    self._wakeup.wait(JOB_POLL_INTERVAL)
+                    self._wakeup.clear()
+                    continue
+                self._run(job)
+            except Exception as e:
+                logger.error(f"[Jobs] Worker error: {str(e)}")
+                self._stop.wait(JOB_POLL_INTERVAL)
+
+    def init_app(self, app):
+        """Start the workers on the first request each server process handles"""
+        self._app = app
+        app.before_request(self._ensure_workers)
+
+    def _ensure_workers(self):
+        # Threads don't survive fork, so a preloaded app starts them again in each worker
+        if self._pid != os.getpid():
+            self.start(self._app)
+
+    def start(self, app):
+        """Start the worker threads for this process"""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._app = app
+            self._pid = os.getpid()
+            self._threads = []
+            self._next_maintenance = 0.0
+            self._running = {}
+            self._init_db()
+            for i in range(self.workers):
+                thread = Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.workers:
+                thread = Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"[Jobs] Started {self.workers} job workers")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+# Global job queue instance
+job_queue = JobQueue()
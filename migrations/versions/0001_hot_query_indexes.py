@@ -0,0 +1,36 @@
+"""Composite indexes for the hot query paths
+
+Tables are still created by db.create_all(), which also creates these
+indexes on fresh databases; this revision adds them to databases created
+before they were declared, and is a no-op where they already exist.
+
+Revision ID: 0001_hot_query_indexes
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_hot_query_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_chat_messages_session_id_created_at', 'chat_messages', ['session_id', 'created_at']),
+    ('ix_health_logs_user_id_recorded_at', 'health_logs', ['user_id', 'recorded_at']),
+    ('ix_chat_sessions_user_id_created_at', 'chat_sessions', ['user_id', 'created_at']),
+    ('ix_audit_logs_created_at', 'audit_logs', ['created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
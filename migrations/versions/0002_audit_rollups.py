@@ -0,0 +1,56 @@
+"""Hourly audit rollups
+
+Creates audit_rollups (also created by db.create_all() on startup) and
+backfills it from the raw audit_logs rows for every hour before the first
+bucket the write-behind flusher has already recorded.
+
+Revision ID: 0002_audit_rollups
+Revises: 0001_hot_query_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_audit_rollups'
+down_revision = '0001_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'audit_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('endpoint', sa.String(length=255), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hour', 'event_type', 'endpoint', 'status_code', 'user_id',
+                            name='uq_audit_rollups_bucket'),
+        if_not_exists=True
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        hour = "date_trunc('hour', created_at)"
+    else:
+        # Same text layout SQLAlchemy uses for SQLite DateTime columns
+        hour = "strftime('%Y-%m-%d %H:00:00.000000', created_at)"
+    op.execute(f"""
+        INSERT INTO audit_rollups (hour, event_type, endpoint, status_code, user_id, count)
+        SELECT {hour}, event_type, endpoint, status_code, COALESCE(user_id, 0), COUNT(*)
+        FROM audit_logs
+        WHERE created_at IS NOT NULL
+          AND ((SELECT MIN(hour) FROM audit_rollups) IS NULL
+               OR {hour} < (SELECT MIN(hour) FROM audit_rollups))
+        GROUP BY {hour}, event_type, endpoint, status_code, COALESCE(user_id, 0)
+    """)
+
+
+def downgrade():
+    op.drop_table('audit_rollups', if_exists=True)
@@ -0,0 +1,82 @@
+"""Per-user symptom statistics
+
+Creates symptom_stats (also created by db.create_all() on startup) and
+fills it from health_logs. Any rows written before the upgrade are
+replaced, so the table matches the logs afterwards; later drift can be
+repaired with `flask --app main rebuild-symptom-stats`.
+
+Revision ID: 0003_symptom_stats
+Revises: 0002_audit_rollups
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_symptom_stats'
+down_revision = '0002_audit_rollups'
+branch_labels = None
+depends_on = None
+
+
+def normalize_symptom(symptom):
+    # Must match symptom_stats.normalize_symptom at the time of this revision
+    return (symptom or "").strip(" ").lower()
+
+
+def upgrade():
+    symptom_stats = op.create_table(
+        'symptom_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('symptom_key', sa.String(length=200), nullable=False),
+        sa.Column('symptom', sa.String(length=200), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('severity_count', sa.Integer(), nullable=False),
+        sa.Column('severity_sum', sa.Integer(), nullable=False),
+        sa.Column('first_log_id', sa.Integer(), nullable=True),
+        sa.Column('first_severity', sa.Integer(), nullable=True),
+        sa.Column('first_recorded_at', sa.DateTime(), nullable=True),
+        sa.Column('last_log_id', sa.Integer(), nullable=True),
+        sa.Column('last_severity', sa.Integer(), nullable=True),
+        sa.Column('last_recorded_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'symptom_key', name='uq_symptom_stats_user_symptom'),
+        if_not_exists=True
+    )
+
+    health_logs = sa.table(
+        'health_logs', sa.column('id'), sa.column('user_id'), sa.column('symptom'),
+        sa.column('severity'), sa.column('recorded_at', sa.DateTime())
+    )
+    logs = op.get_bind().execute(sa.select(health_logs).order_by(
+        health_logs.c.user_id, health_logs.c.recorded_at, health_logs.c.id
+    ))
+
+    stats = {}
+    for log in logs:
+        key = (log.user_id, normalize_symptom(log.symptom))
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = {
+                'user_id': log.user_id, 'symptom_key': key[1], 'count': 0,
+                'severity_count': 0, 'severity_sum': 0, 'first_log_id': log.id,
+                'first_severity': log.severity, 'first_recorded_at': log.recorded_at
+            }
+        stat['count'] += 1
+        if log.severity is not None:
+            stat['severity_count'] += 1
+            stat['severity_sum'] += log.severity
+        stat.update(symptom=log.symptom.strip(), last_log_id=log.id,
+                    last_severity=log.severity, last_recorded_at=log.recorded_at)
+
+    op.execute(symptom_stats.delete())
+    if stats:
+        op.bulk_insert(symptom_stats, list(stats.values()))
+
+
+def downgrade():
+    op.drop_table('symptom_stats', if_exists=True)
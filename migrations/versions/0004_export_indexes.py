@@ -0,0 +1,34 @@
+"""Indexes for the data export and symptom statistics queries
+
+Adds ix_chat_sessions_user_id_id so the export walks a user's sessions
+in id order without a sort, and a named unique index on symptom_stats
+(user_id, symptom_key). On PostgreSQL the unique constraint from
+0003_symptom_stats already provides an index with that name; SQLite
+only has an unnamed automatic index, which query plans can't be checked
+against.
+
+Revision ID: 0004_export_indexes
+Revises: 0003_symptom_stats
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_export_indexes'
+down_revision = '0003_symptom_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_chat_sessions_user_id_id', 'chat_sessions', ['user_id', 'id'], if_not_exists=True)
+    op.create_index('uq_symptom_stats_user_symptom', 'symptom_stats', ['user_id', 'symptom_key'],
+                    unique=True, if_not_exists=True)
+
+
+def downgrade():
+    # uq_symptom_stats_user_symptom stays: on databases built by db.create_all() it is the
+    # only unique index the symptom_stats upserts can conflict on
+    op.drop_index('ix_chat_sessions_user_id_id', table_name='chat_sessions', if_exists=True)
@@ -42,9 +42,43 @@ class HealthLog(db.Model):
     description = db.Column(db.Text)
     recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Journal, symptom history: filter by user, newest first
+        db.Index('ix_health_logs_user_id_recorded_at', 'user_id', 'recorded_at'),
+    )
+
     def __repr__(self):
         return f'<HealthLog {self.symptom} - {self.recorded_at}>'
 
+class SymptomStat(db.Model):
+    """Running per-user statistics for each symptom, maintained as health logs are added and deleted"""
+    __tablename__ = 'symptom_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    symptom_key = db.Column(db.String(200), nullable=False)  # Trimmed, lower-cased symptom
+    symptom = db.Column(db.String(200), nullable=False)  # Label of the most recent log
+    count = db.Column(db.Integer, nullable=False, default=0)
+    severity_count = db.Column(db.Integer, nullable=False, default=0)  # Logs with a severity
+    severity_sum = db.Column(db.Integer, nullable=False, default=0)
+    first_log_id = db.Column(db.Integer)
+    first_severity = db.Column(db.Integer)
+    first_recorded_at = db.Column(db.DateTime)
+    last_log_id = db.Column(db.Integer)
+    last_severity = db.Column(db.Integer)
+    last_recorded_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Unique index rather than a constraint so SQLite reports it by name in query plans
+        db.Index('uq_symptom_stats_user_symptom', 'user_id', 'symptom_key', unique=True),
+    )
+
+    @property
+    def average_severity(self):
+        return self.severity_sum / self.severity_count if self.severity_count else None
+
+    def __repr__(self):
+        return f'<SymptomStat {self.user_id} {self.symptom_key} x{self.count}>'
+
 class ChatSession(db.Model):
     """Model for storing chat history"""
     __tablename__ = 'chat_sessions'
@@ -53,6 +87,13 @@ class ChatSession(db.Model):
     title = db.Column(db.String(200), default="New Conversation")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Session sidebar: filter by user, newest first
+        db.Index('ix_chat_sessions_user_id_created_at', 'user_id', 'created_at'),
+        # Data export: a user's sessions in id order
+        db.Index('ix_chat_sessions_user_id_id', 'user_id', 'id'),
+    )
+
     # Relationships
     messages = db.relationship('ChatMessage', backref='session', lazy='dynamic', cascade="all, delete-orphan")
 
@@ -73,6 +114,11 @@ class ChatMessage(db.Model):
     severity_level = db.Column(db.Integer)  # 0-none, 1-low, 2-medium, 3-high
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Chat history and export: filter by session, oldest first
+        db.Index('ix_chat_messages_session_id_created_at', 'session_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<ChatMessage {self.id}>'
 
@@ -89,9 +135,33 @@ class AuditLog(db.Model):
     details = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Admin dashboard: latest events
+        db.Index('ix_audit_logs_created_at', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<AuditLog {self.event_type}>'
 
+class AuditRollup(db.Model):
+    """Hourly audit event counts per endpoint, status and user, kept after raw events expire"""
+    __tablename__ = 'audit_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False)  # Start of the hour (UTC)
+    event_type = db.Column(db.String(50), nullable=False)
+    endpoint = db.Column(db.String(255), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, default=0)  # 0 for anonymous requests
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('hour', 'event_type', 'endpoint', 'status_code', 'user_id',
+                            name='uq_audit_rollups_bucket'),
+    )
+
+    def __repr__(self):
+        return f'<AuditRollup {self.hour} {self.endpoint} {self.status_code}>'
+
 class ScalabilityMetrics(db.Model):
     """Model for storing scalability metrics"""
     __tablename__ = 'scalability_metrics'
@@ -117,3 +187,19 @@ class PerformanceMetric(db.Model):
 
     def __repr__(self):
         return f'<PerformanceMetric {self.label}>'
+
+class ImageAnalysis(db.Model):
+    """Model for caching vision analyses by image content hash and prompt version"""
+    __tablename__ = 'image_analyses'
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the uploaded bytes
+    prompt_version = db.Column(db.String(64), nullable=False)  # Fingerprint of model, config and prompt
+    result = db.Column(db.Text, nullable=False)  # JSON-encoded analysis result
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'prompt_version', name='uq_image_analyses_hash_version'),
+    )
+
+    def __repr__(self):
+        return f'<ImageAnalysis {self.content_hash[:12]} {self.prompt_version}>'
@@ -0,0 +1,76 @@
+import os
+import base64
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from models import ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Page sizes for the dashboard and its JSON endpoints (override via environment)
+DASHBOARD_PAGE_SIZE = int(os.environ.get("DASHBOARD_PAGE_SIZE", "30"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "100"))
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that wasn't issued by encode_cursor"""
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor for the (created_at, id) position of a row"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+def page_size(limit: Optional[int], default: int = DASHBOARD_PAGE_SIZE) -> int:
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    return max(1, min(limit or default, MAX_PAGE_SIZE))
+
+def _keyset_page(query, model, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Newest-first page of rows strictly older than the cursor
+
+    Rows are ordered by (created_at, id) descending so ties on created_at
+    still page deterministically. One extra row is fetched to tell whether
+    another page follows.
+
+    Returns:
+        Tuple of (rows newest first, cursor for the next page or None)
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+def page_sessions(user_id: int, cursor: Optional[str] = None,
+                  limit: int = DASHBOARD_PAGE_SIZE) -> Tuple[List[ChatSession], Optional[str]]:
+    """A user's chat sessions, most recent first"""
+    return _keyset_page(ChatSession.query.filter_by(user_id=user_id), ChatSession, cursor, limit)
+
+def page_messages(session_id: int, cursor: Optional[str] = None,
+                  limit: int = DASHBOARD_PAGE_SIZE) -> Tuple[List[ChatMessage], Optional[str]]:
+    """
+    A page of a session's messages, returned oldest first for display
+
+    The cursor walks backwards in time: each next cursor points at older
+    messages than the page it came with.
+    """
+    rows, next_cursor = _keyset_page(ChatMessage.query.filter_by(session_id=session_id),
+                                     ChatMessage, cursor, limit)
+    return rows[::-1], next_cursor
@@ -0,0 +1,33 @@
+import os
+import logging
+from typing import Any, Dict
+
+from audio_service import transcribe_audio
+from groq_service import generate_health_response
+
+logger = logging.getLogger(__name__)
+
+# Runs inside batch worker processes, so this module must not import the Flask app
+
+def reprocess_voice_message(message_id: int, audio_path: str, reanalyze: bool = False) -> Dict[str, Any]:
+    """
+    Re-transcribe one stored voice message, optionally regenerating the AI reply
+
+    Returns:
+        Dict with the message id, new transcript and AI response (or an error)
+    """
+    if not audio_path or not os.path.exists(audio_path):
+        return {"id": message_id, "error": "Audio file not found"}
+
+    try:
+        transcript = transcribe_audio(audio_path)
+        if transcript is None:
+            return {"id": message_id, "error": "Could not transcribe audio"}
+
+        result = {"id": message_id, "transcript": transcript}
+        if reanalyze:
+            result["ai_response"] = generate_health_response(transcript)
+        return result
+    except Exception as e:
+        logger.error(f"Error reprocessing voice message {message_id}: {str(e)}")
+        return {"id": message_id, "error": str(e)}
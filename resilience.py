@@ -0,0 +1,231 @@
+import os
+import time
+import random
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Retry settings (override via environment)
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "8"))
+LLM_ACQUIRE_TIMEOUT = float(os.environ.get("LLM_ACQUIRE_TIMEOUT", "10"))
+
+# Circuit breaker settings
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", "30"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Google API errors that are worth retrying (matched by class name so
+# google-api-core stays an indirect dependency)
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "BadGateway", "GatewayTimeout",
+    "ConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout", "ChunkedEncodingError",
+}
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit breaker is open"""
+
+class RateLimitExceeded(Exception):
+    """Raised when no rate-limit token became available in time"""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float = LLM_ACQUIRE_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open after a cool-down lets one probe through"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a half-open probe slot without recording an outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"[{self.name}] Circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def get_state(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) \
+                if state == self.OPEN else 0.0
+            return {"state": state, "consecutive_failures": self._failures, "retry_in": round(retry_in, 1)}
+
+class ProviderGuard:
+    """Rate limiting, jittered exponential retry and circuit breaking around one LLM provider"""
+
+    def __init__(self, name: str, rate: float, burst: float, max_retries: int = LLM_MAX_RETRIES):
+        self.name = name
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(name)
+        self.max_retries = max_retries
+        self.retries = 0
+        self.rejections = 0
+
+    @staticmethod
+    def _is_retryable_error(error: Exception) -> bool:
+        if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+            return True
+        return getattr(error, "code", None) in RETRYABLE_STATUSES
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None):
+        # Full jitter, but never sooner than the provider asked for
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, LLM_BACKOFF_MAX))
+        self.retries += 1
+        time.sleep(delay)
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Run func under the limiter and breaker, retrying retryable failures
+
+        HTTP responses with a retryable status are returned to the caller
+        once retries are exhausted so its raise_for_status() still applies.
+        """
+        if not self.breaker.allow():
+            self.rejections += 1
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        attempt = 0
+        while True:
+            if not self.limiter.acquire():
+                self.rejections += 1
+                self.breaker.release()
+                raise RateLimitExceeded(f"{self.name} rate limit exceeded")
+
+            try:
+                result = func()
+            except Exception as e:
+                if not self._is_retryable_error(e):
+                    self.breaker.release()
+                    raise
+                if attempt < self.max_retries:
+                    logger.warning(f"[{self.name}] {type(e).__name__}, retry {attempt + 1}/{self.max_retries}")
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+
+            status = getattr(result, "status_code", None)
+            if status in RETRYABLE_STATUSES:
+                if attempt < self.max_retries:
+                    logger.warning(f"[{self.name}] HTTP {status}, retry {attempt + 1}/{self.max_retries}")
+                    result.close()
+                    self._backoff(attempt, self._retry_after(result))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                return result
+
+            self.breaker.record_success()
+            return result
+
+    def get_state(self) -> Dict[str, Any]:
+        return dict(self.breaker.get_state(),
+                    tokens_available=round(self.limiter.available, 2),
+                    retries=self.retries,
+                    rejections=self.rejections)
+
+# Global provider guards shared by every Groq and Gemini call in this process
+groq_guard = ProviderGuard("groq",
+                           rate=float(os.environ.get("GROQ_RATE_LIMIT", "5")),
+                           burst=float(os.environ.get("GROQ_BURST", "10")))
+gemini_guard = ProviderGuard("gemini",
+                             rate=float(os.environ.get("GEMINI_RATE_LIMIT", "2")),
+                             burst=float(os.environ.get("GEMINI_BURST", "5")))
+
+provider_guards = {guard.name: guard for guard in (groq_guard, gemini_guard)}
+
+def get_provider_states() -> Dict[str, Dict[str, Any]]:
+    return {name: guard.get_state() for name, guard in provider_guards.items()}
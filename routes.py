@@ -2,29 +2,50 @@ import os
 import uuid
 import time
 import json
+import zlib
 import base64
 import logging
-import requests
 from io import BytesIO
 from datetime import datetime
 
-from flask import render_template, redirect, url_for, flash, request, jsonify, session, send_from_directory
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, send_from_directory, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 
 from app import app, db
-from models import User, HealthLog, ChatSession, ChatMessage, PerformanceMetric, AuditLog
+from models import User, HealthLog, ChatSession, ChatMessage, PerformanceMetric, AuditLog, SymptomStat
 from scalability import load_balancer
 from forms import LoginForm, RegistrationForm, HealthLogForm
-from groq_service import generate_health_response, analyze_health_question, analyze_symptoms_patterns
-from gemini_service import analyze_image
+from groq_service import generate_health_response, stream_health_response, analyze_symptoms_patterns
+from gemini_service import analyze_image, analyze_image_with_history, IMAGE_PROMPT_VERSION, history_prompt_version
+from upload_store import (store_upload, get_or_create_analysis, sweep_temp_files, content_hash as hash_upload,
+                          create_chunked_upload, get_chunked_upload, append_chunk, commit_chunked_upload,
+                          discard_chunked_upload, ChunkedUploadError, UploadTooLarge)
 from audio_service import transcribe_audio
+from transcription import transcription_pipeline
+from security_audit import security_audit
+from user_cache import user_cache, invalidate_user
+from symptom_stats import record_log, remove_log
+from audit_retention import rollup_summary, run_maintenance as run_audit_maintenance
+from http_client import http_client
+from cache import response_cache
+from triage import triage_text
+from pagination import page_sessions, page_messages, page_size, InvalidCursor
+from analytics import count_user_messages, severity_summary, symptom_trends, iter_health_logs, iter_sessions_with_messages
+from job_queue import job_queue, STATUS_DONE, STATUS_FAILED, FINISHED_STATUSES
 
 logger = logging.getLogger(__name__)
 
 # Allowed file extensions
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'ogg'}
+ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'ogg', 'webm', 'm4a'}
+
+# Export responses are flushed in blocks of about this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# How long a job event stream stays open and how often it checks the job
+JOB_EVENTS_TIMEOUT = 120
+JOB_EVENTS_POLL_INTERVAL = 0.5
 
 def allowed_image_file(filename):
     """Check if uploaded file has allowed image extension"""
@@ -34,6 +55,38 @@ def allowed_audio_file(filename):
     """Check if uploaded file has allowed audio extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_AUDIO_EXTENSIONS
 
+EMERGENCY_INFO = """
+
+**EMERGENCY CONTACT INFORMATION (INDIA):**
+- **National Emergency Number:** 112
+- **Ambulance:** 108 or 102
+- **Medical Helpline:** 104
+- **COVID-19 Helpline:** 1075
+- **Women Helpline:** 1091
+
+**Please seek immediate medical attention for serious symptoms.**
+"""
+
+HELPLINE_INFO = """
+
+**HEALTH HELPLINE INFORMATION (INDIA):**
+- **Medical Helpline:** 104
+- **COVID-19 Helpline:** 1075
+- **Mental Health Helpline:** 1800-599-0019
+"""
+
+def append_helpline_info(ai_response, severity_level, emergency=False):
+    """Append emergency (level 3) or general helpline (level 2) contacts to a response"""
+    if severity_level == 3 or emergency:
+        return ai_response + EMERGENCY_INFO
+    if severity_level == 2:
+        return ai_response + HELPLINE_INFO
+    return ai_response
+
+def sse_event(event, data):
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 # Routes
 @app.route('/')
 def landing():
@@ -116,16 +169,16 @@ def dashboard():
         db.session.commit()
         session['active_session_id'] = chat_session.id
 
-    # Get all user sessions for sidebar
-    user_sessions = ChatSession.query.filter_by(user_id=current_user.id).order_by(ChatSession.created_at.desc()).all()
-
-    # Get messages for current session
-    messages = ChatMessage.query.filter_by(session_id=chat_session.id).order_by(ChatMessage.created_at.asc()).all()
+    # Only the latest page of each list is rendered; chat.js fetches older pages on scroll
+    user_sessions, sessions_cursor = page_sessions(current_user.id)
+    messages, messages_cursor = page_messages(chat_session.id)
 
     return render_template('dashboard.html', 
                            session=chat_session, 
                            messages=messages, 
-                           user_sessions=user_sessions)
+                           user_sessions=user_sessions,
+                           sessions_cursor=sessions_cursor,
+                           messages_cursor=messages_cursor)
 
 @app.route('/health-journal', methods=['GET', 'POST'])
 @login_required
@@ -141,6 +194,7 @@ def health_journal():
             description=form.description.data
         )
         db.session.add(log)
+        record_log(log)
         db.session.commit()
         flash('Health log added successfully', 'success')
         return redirect(url_for('health_journal'))
@@ -180,6 +234,7 @@ def profile():
             current_user.set_password(new_password)
 
         db.session.commit()
+        invalidate_user(current_user.id)
         flash('Profile updated successfully', 'success')
         return redirect(url_for('profile'))
 
@@ -205,6 +260,52 @@ def new_chat_session():
         logger.error(f"Error creating new session: {str(e)}")
         return jsonify({'success': False, 'error': 'Failed to create new session'}), 500
 
+def message_json(message):
+    """Chat message fields the dashboard needs to render it"""
+    return {
+        'id': message.id,
+        'is_user': message.is_user,
+        'content': message.content,
+        'message_type': message.message_type,
+        'severity': message.severity_level,
+        'image_url': f"/images/{os.path.basename(message.image_path)}" if message.image_path else None,
+        'audio_url': f"/images/{os.path.basename(message.audio_path)}" if message.audio_path else None,
+        'created_at': message.created_at.isoformat()
+    }
+
+@app.route('/api/chat/sessions', methods=['GET'])
+@login_required
+def list_chat_sessions():
+    """API route for a page of the user's sessions, most recent first"""
+    try:
+        sessions, next_cursor = page_sessions(current_user.id, request.args.get('cursor'),
+                                              page_size(request.args.get('limit', type=int)))
+    except InvalidCursor:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'success': True,
+        'sessions': [export_session(chat_session) for chat_session in sessions],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/chat/sessions/<int:session_id>/messages', methods=['GET'])
+@login_required
+def list_chat_messages(session_id):
+    """API route for a page of a session's messages older than the cursor, oldest first"""
+    chat_session = ChatSession.query.filter_by(id=session_id, user_id=current_user.id).first_or_404()
+    try:
+        messages, next_cursor = page_messages(chat_session.id, request.args.get('cursor'),
+                                              page_size(request.args.get('limit', type=int)))
+    except InvalidCursor:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'success': True,
+        'messages': [message_json(message) for message in messages],
+        'next_cursor': next_cursor
+    })
+
 @app.route('/api/chat/select-session/<int:session_id>', methods=['POST'])
 @login_required
 def select_chat_session(session_id):
@@ -299,8 +400,8 @@ def send_message():
     db.session.commit()
 
     try:
-        # Analyze message for health insights
-        health_analysis = analyze_health_question(content)
+        # Triage message locally for severity and red flags
+        health_analysis = triage_text(content)
 
         # Generate AI response
         ai_response = generate_health_response(content)
@@ -308,31 +409,8 @@ def send_message():
         # Determine severity level (0-none, 1-low, 2-medium, 3-high)
         severity_level = health_analysis.get('severity', 0)
 
-        # Add emergency information for severe cases (level 3)
-        if severity_level == 3 or health_analysis.get('emergency', False):
-            emergency_info = """
-
-**EMERGENCY CONTACT INFORMATION (INDIA):**
-- **National Emergency Number:** 112
-- **Ambulance:** 108 or 102
-- **Medical Helpline:** 104
-- **COVID-19 Helpline:** 1075
-- **Women Helpline:** 1091
-
-**Please seek immediate medical attention for serious symptoms.**
-"""
-            ai_response += emergency_info
-
-        # For moderate concern, add general helpline information
-        elif severity_level == 2:
-            helpline_info = """
-
-**HEALTH HELPLINE INFORMATION (INDIA):**
-- **Medical Helpline:** 104
-- **COVID-19 Helpline:** 1075
-- **Mental Health Helpline:** 1800-599-0019
-"""
-            ai_response += helpline_info
+        # Add emergency or helpline information based on severity
+        ai_response = append_helpline_info(ai_response, severity_level, health_analysis.get('emergency', False))
 
         # Save AI response
         ai_message = ChatMessage(
@@ -373,10 +451,95 @@ def send_message():
         logger.error(f"Error in send_message: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/chat/stream-message', methods=['POST'])
+@login_required
+def stream_message():
+    """API route to send a text message and stream the AI response over SSE"""
+    session_id = session.get('active_session_id')
+    if not session_id:
+        return jsonify({'success': False, 'error': 'No active session'}), 400
+
+    chat_session = ChatSession.query.filter_by(id=session_id, user_id=current_user.id).first()
+    if not chat_session:
+        return jsonify({'success': False, 'error': 'Session not found'}), 404
+
+    content = request.json.get('message', '').strip()
+    if not content:
+        return jsonify({'success': False, 'error': 'Empty message'}), 400
+
+    # Save user message
+    user_message = ChatMessage(
+        session_id=session_id,
+        is_user=True,
+        content=content,
+        message_type='text'
+    )
+    db.session.add(user_message)
+    db.session.commit()
+
+    # Triage message locally for severity and red flags
+    health_analysis = triage_text(content)
+
+    def generate():
+        try:
+            chunks = []
+            for token in stream_health_response(content):
+                chunks.append(token)
+                yield sse_event('token', {'content': token})
+
+            severity_level = health_analysis.get('severity', 0)
+
+            # Add emergency or helpline information based on severity
+            ai_response = append_helpline_info(''.join(chunks), severity_level, health_analysis.get('emergency', False))
+
+            # Save AI response once the stream has finished
+            ai_message = ChatMessage(
+                session_id=session_id,
+                is_user=False,
+                content=ai_response,
+                message_type='text',
+                health_analysis=str(health_analysis),
+                severity_level=severity_level
+            )
+            db.session.add(ai_message)
+
+            # Update session title if it's the default title
+            if chat_session.title == "New Conversation":
+                chat_session.title = content[:50] + ('...' if len(content) > 50 else '')
+
+            db.session.commit()
+
+            yield sse_event('done', {
+                'success': True,
+                'user_message': {
+                    'id': user_message.id,
+                    'content': user_message.content,
+                    'type': user_message.message_type,
+                    'created_at': user_message.created_at.isoformat()
+                },
+                'ai_message': {
+                    'id': ai_message.id,
+                    'content': ai_message.content,
+                    'type': ai_message.message_type,
+                    'severity': ai_message.severity_level,
+                    'created_at': ai_message.created_at.isoformat()
+                },
+                'session_title': chat_session.title
+            })
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in stream_message: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': str(e)})
+
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/chat/upload-image', methods=['POST'])
 @login_required
 def upload_image():
-    """API route to upload an image for analysis"""
+    """API route to upload an image and queue it for analysis"""
     session_id = session.get('active_session_id')
     if not session_id:
         return jsonify({'success': False, 'error': 'No active session'}), 400
@@ -396,15 +559,9 @@ def upload_image():
         return jsonify({'success': False, 'error': 'Invalid file type'}), 400
 
     try:
-        # Generate unique filename
-        filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
-        # Convert image to base64 for AI analysis
-        file.seek(0)
-        image_data = file.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        # Store once by content hash; re-uploads reuse the existing file
+        filepath, content_hash = store_upload(file.stream, secure_filename(file.filename),
+                                              app.config['UPLOAD_FOLDER'])
 
         # Save user message with image
         user_message = ChatMessage(
@@ -417,79 +574,96 @@ def upload_image():
         db.session.add(user_message)
         db.session.commit()
 
-        # Analyze image using OpenAI Vision
-        analysis_result = analyze_image(base64_image)
-
-        # Generate health-specific response
-        health_context = f"Based on the image analysis: {analysis_result}"
-        ai_response = generate_health_response(health_context)
-
-        # Determine severity level (placeholder logic, would be more sophisticated in production)
-        severity_indicators = ["urgent", "emergency", "severe", "critical", "immediate attention"]
-        severity_level = 0
-        for indicator in severity_indicators:
-            if indicator in analysis_result.lower() or indicator in ai_response.lower():
-                severity_level = 3  # High severity
-                break
-
-        # Add emergency information for severe cases (level 3)
-        if severity_level == 3:
-            emergency_info = """
-
-**EMERGENCY CONTACT INFORMATION (INDIA):**
-- **National Emergency Number:** 112
-- **Ambulance:** 108 or 102
-- **Medical Helpline:** 104
-- **COVID-19 Helpline:** 1075
-- **Women Helpline:** 1091
-
-**Please seek immediate medical attention for serious symptoms.**
-"""
-            ai_response += emergency_info
-
-        # Save AI response
-        ai_message = ChatMessage(
-            session_id=session_id,
-            is_user=False,
-            content=ai_response,
-            message_type='text',
-            health_analysis=analysis_result,
-            severity_level=severity_level
-        )
-        db.session.add(ai_message)
-
-        # Update session title if it's the default title
-        if chat_session.title == "New Conversation":
-            chat_session.title = "Image Analysis"
-
-        db.session.commit()
+        # Analysis runs in the background job workers
+        job_id = job_queue.enqueue('image_analysis', {
+            'session_id': session_id,
+            'user_message_id': user_message.id,
+            'content_hash': content_hash
+        }, user_id=current_user.id)
 
         return jsonify({
             'success': True,
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id),
             'user_message': {
                 'id': user_message.id,
                 'type': user_message.message_type,
                 'image_path': filepath,
                 'created_at': user_message.created_at.isoformat()
-            },
-            'ai_message': {
-                'id': ai_message.id,
-                'content': ai_message.content,
-                'type': ai_message.message_type,
-                'severity': ai_message.severity_level,
-                'created_at': ai_message.created_at.isoformat()
-            },
-            'session_title': chat_session.title
-        })
+            }
+        }), 202
 
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error in upload_image: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def process_image_analysis_job(payload):
+    """Job handler: analyze an uploaded image and store the AI response"""
+    user_message = db.session.get(ChatMessage, payload['user_message_id'])
+    chat_session = db.session.get(ChatSession, payload['session_id'])
+    if not user_message or not chat_session:
+        raise ValueError('Chat message or session no longer exists')
+
+    with open(user_message.image_path, 'rb') as f:
+        image_data = f.read()
+
+    # Analyze image using Gemini Vision, reusing any earlier analysis of the same image
+    content_hash = payload.get('content_hash') or hash_upload(image_data)
+    analysis_result = get_or_create_analysis(content_hash, IMAGE_PROMPT_VERSION,
+                                             lambda: analyze_image(image_data))
+
+    # Generate health-specific response
+    health_context = f"Based on the image analysis: {analysis_result}"
+    ai_response = generate_health_response(health_context)
+
+    # Triage the image analysis and response for severity and red flags
+    health_analysis = triage_text(f"{analysis_result}\n{ai_response}")
+    severity_level = health_analysis['severity']
+
+    # Add emergency or helpline information based on severity
+    ai_response = append_helpline_info(ai_response, severity_level, health_analysis['emergency'])
+
+    # Save AI response
+    ai_message = ChatMessage(
+        session_id=chat_session.id,
+        is_user=False,
+        content=ai_response,
+        message_type='text',
+        health_analysis=analysis_result,
+        severity_level=severity_level
+    )
+    db.session.add(ai_message)
+
+    # Update session title if it's the default title
+    if chat_session.title == "New Conversation":
+        chat_session.title = "Image Analysis"
+
+    db.session.commit()
+
+    return {
+        'success': True,
+        'user_message': {
+            'id': user_message.id,
+            'type': user_message.message_type,
+            'image_path': user_message.image_path,
+            'created_at': user_message.created_at.isoformat()
+        },
+        'ai_message': {
+            'id': ai_message.id,
+            'content': ai_message.content,
+            'type': ai_message.message_type,
+            'severity': ai_message.severity_level,
+            'created_at': ai_message.created_at.isoformat()
+        },
+        'session_title': chat_session.title
+    }
+
 @app.route('/api/chat/send-audio', methods=['POST'])
 @login_required
 def send_audio():
-    """API route to send audio for transcription and analysis"""
+    """API route to upload audio and queue it for transcription and analysis"""
     session_id = session.get('active_session_id')
     if not session_id:
         return jsonify({'success': False, 'error': 'No active session'}), 400
@@ -509,12 +683,7 @@ def send_audio():
         audio_data = audio_data.split(',')[1] if ',' in audio_data else audio_data
         audio_bytes = base64.b64decode(audio_data)
 
-        # Save to temporary file
-        filename = f"{uuid.uuid4()}.wav"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
-        with open(filepath, 'wb') as f:
-            f.write(audio_bytes)
+        filepath, content_hash = store_upload(audio_bytes, "recording.wav", app.config['UPLOAD_FOLDER'])
     else:
         file = request.files['audio']
         if file.filename == '':
@@ -523,116 +692,271 @@ def send_audio():
         if not allowed_audio_file(file.filename):
             return jsonify({'success': False, 'error': 'Invalid file type'}), 400
 
-        # Generate unique filename
-        filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Store once by content hash; re-uploads reuse the existing file
+        filepath, content_hash = store_upload(file.stream, secure_filename(file.filename),
+                                              app.config['UPLOAD_FOLDER'])
 
     try:
-        # Transcribe audio
-        transcript = transcribe_audio(filepath)
+        return enqueue_audio_message(session_id, filepath)
+    except Exception as e:
+        logger.error(f"Error in send_audio: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        # Set default message content if transcription failed
-        message_content = transcript
-        if not transcript or transcript.startswith("Could not transcribe") or transcript.startswith("Audio unclear") or transcript.startswith("Unable to connect"):
-            message_content = "Could not transcribe audio clearly"
+def enqueue_audio_message(session_id, filepath):
+    """Queue a stored voice message for transcription and return the 202 job response"""
+    # Transcription and analysis run in the background job workers
+    job_id = job_queue.enqueue('audio_message', {
+        'session_id': session_id,
+        'audio_path': filepath
+    }, user_id=current_user.id)
 
-        # Save user message with audio and transcript
-        user_message = ChatMessage(
-            session_id=session_id,
-            is_user=True,
-            content=message_content,
-            message_type='voice',
-            audio_path=filepath
-        )
-        db.session.add(user_message)
-        db.session.commit()
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'events_url': url_for('job_events', job_id=job_id)
+    }), 202
+
+def get_user_audio_upload(upload_id):
+    """Return a chunked audio upload's metadata if it belongs to the current user"""
+    meta = get_chunked_upload(app.config['UPLOAD_FOLDER'], upload_id)
+    if not meta or meta.get('user_id') != current_user.id:
+        return None
+    return meta
+
+@app.route('/api/chat/audio-uploads', methods=['POST'])
+@login_required
+def create_audio_upload():
+    """API route to start a chunked voice message upload"""
+    session_id = session.get('active_session_id')
+    if not session_id:
+        return jsonify({'success': False, 'error': 'No active session'}), 400
 
-        if not transcript or transcript.startswith("Could not transcribe") or transcript.startswith("Audio unclear") or transcript.startswith("Unable to connect"):
-            return jsonify({
-                'success': True,
-                'user_message': {
-                    'id': user_message.id,
-                    'content': message_content,
-                    'type': user_message.message_type,
-                    'audio_path': filepath,
-                    'created_at': user_message.created_at.isoformat()
-                }
-            })
+    chat_session = ChatSession.query.filter_by(id=session_id, user_id=current_user.id).first()
+    if not chat_session:
+        return jsonify({'success': False, 'error': 'Session not found'}), 404
 
-        # Generate AI response based on transcript
-        health_analysis = analyze_health_question(transcript)
-        ai_response = generate_health_response(transcript)
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or 'recording.webm')
+    if not allowed_audio_file(filename):
+        return jsonify({'success': False, 'error': 'Invalid file type'}), 400
 
-        # Determine severity level
-        severity_level = health_analysis.get('severity', 0)
+    upload_id = create_chunked_upload(app.config['UPLOAD_FOLDER'], {
+        'user_id': current_user.id,
+        'session_id': session_id,
+        'filename': filename
+    })
 
-        # Add emergency information for severe cases (level 3)
-        if severity_level == 3 or health_analysis.get('emergency', False):
-            emergency_info = """
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'chunk_url': url_for('append_audio_chunk', upload_id=upload_id),
+        'commit_url': url_for('commit_audio_upload', upload_id=upload_id)
+    }), 201
 
-**EMERGENCY CONTACT INFORMATION (INDIA):**
-- **National Emergency Number:** 112
-- **Ambulance:** 108 or 102
-- **Medical Helpline:** 104
-- **COVID-19 Helpline:** 1075
-- **Women Helpline:** 1091
+@app.route('/api/chat/audio-uploads/<upload_id>', methods=['PUT'])
+@login_required
+def append_audio_chunk(upload_id):
+    """API route to append the next raw chunk (request body) at ?offset= to an upload"""
+    meta = get_user_audio_upload(upload_id)
+    if not meta:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
 
-**Please seek immediate medical attention for serious symptoms.**
-"""
-            ai_response += emergency_info
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': 'Missing offset'}), 400
 
-        # For moderate concern, add general helpline information
-        elif severity_level == 2:
-            helpline_info = """
+    try:
+        received = append_chunk(app.config['UPLOAD_FOLDER'], upload_id, request.stream, offset)
+    except UploadTooLarge as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except ChunkedUploadError as e:
+        # Tell the client where to resume from
+        return jsonify({'success': False, 'error': str(e), 'received': meta['size']}), 409
 
-**HEALTH HELPLINE INFORMATION (INDIA):**
-- **Medical Helpline:** 104
-- **COVID-19 Helpline:** 1075
-- **Mental Health Helpline:** 1800-599-0019
-"""
-            ai_response += helpline_info
+    return jsonify({'success': True, 'received': received})
 
-        # Save AI response
-        ai_message = ChatMessage(
-            session_id=session_id,
-            is_user=False,
-            content=ai_response,
-            message_type='text',
-            health_analysis=str(health_analysis),
-            severity_level=severity_level
-        )
-        db.session.add(ai_message)
+@app.route('/api/chat/audio-uploads/<upload_id>/commit', methods=['POST'])
+@login_required
+def commit_audio_upload(upload_id):
+    """API route to finish a chunked upload and queue it for transcription"""
+    meta = get_user_audio_upload(upload_id)
+    if not meta:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
 
-        # Update session title if it's the default title
-        if chat_session.title == "New Conversation" and transcript:
-            chat_session.title = transcript[:50] + ('...' if len(transcript) > 50 else '')
+    if meta['size'] == 0:
+        discard_chunked_upload(app.config['UPLOAD_FOLDER'], upload_id)
+        return jsonify({'success': False, 'error': 'No audio provided'}), 400
 
-        db.session.commit()
+    try:
+        filepath, content_hash = commit_chunked_upload(app.config['UPLOAD_FOLDER'], upload_id,
+                                                       meta['filename'])
+        return enqueue_audio_message(meta['session_id'], filepath)
+    except Exception as e:
+        logger.error(f"Error in commit_audio_upload: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        return jsonify({
+@app.route('/api/chat/audio-uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def discard_audio_upload(upload_id):
+    """API route to cancel a chunked upload"""
+    if not get_user_audio_upload(upload_id):
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+
+    discard_chunked_upload(app.config['UPLOAD_FOLDER'], upload_id)
+    return jsonify({'success': True})
+
+def process_audio_message_job(payload):
+    """Job handler: transcribe a voice message and store it with the AI response"""
+    chat_session = db.session.get(ChatSession, payload['session_id'])
+    if not chat_session:
+        raise ValueError('Chat session no longer exists')
+
+    session_id = chat_session.id
+    filepath = payload['audio_path']
+
+    # Transcribe audio
+    transcript = transcribe_audio(filepath)
+
+    # Set default message content if transcription failed
+    message_content = transcript
+    if transcript is None:
+        message_content = "Could not transcribe audio clearly"
+
+    # Save user message with audio and transcript
+    user_message = ChatMessage(
+        session_id=session_id,
+        is_user=True,
+        content=message_content,
+        message_type='voice',
+        audio_path=filepath
+    )
+    db.session.add(user_message)
+    db.session.commit()
+
+    if transcript is None:
+        return {
             'success': True,
             'user_message': {
                 'id': user_message.id,
-                'content': user_message.content,
+                'content': message_content,
                 'type': user_message.message_type,
                 'audio_path': filepath,
                 'created_at': user_message.created_at.isoformat()
-            },
-            'ai_message': {
-                'id': ai_message.id,
-                'content': ai_message.content,
-                'type': ai_message.message_type,
-                'severity': ai_message.severity_level,
-                'created_at': ai_message.created_at.isoformat()
-            },
-            'transcript': transcript,
-            'session_title': chat_session.title
-        })
+            }
+        }
 
-    except Exception as e:
-        logger.error(f"Error in send_audio: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Triage transcript locally and generate AI response
+    health_analysis = triage_text(transcript)
+    ai_response = generate_health_response(transcript)
+
+    # Determine severity level
+    severity_level = health_analysis.get('severity', 0)
+
+    # Add emergency or helpline information based on severity
+    ai_response = append_helpline_info(ai_response, severity_level, health_analysis.get('emergency', False))
+
+    # Save AI response
+    ai_message = ChatMessage(
+        session_id=session_id,
+        is_user=False,
+        content=ai_response,
+        message_type='text',
+        health_analysis=str(health_analysis),
+        severity_level=severity_level
+    )
+    db.session.add(ai_message)
+
+    # Update session title if it's the default title
+    if chat_session.title == "New Conversation" and transcript:
+        chat_session.title = transcript[:50] + ('...' if len(transcript) > 50 else '')
+
+    db.session.commit()
+
+    return {
+        'success': True,
+        'user_message': {
+            'id': user_message.id,
+            'content': user_message.content,
+            'type': user_message.message_type,
+            'audio_path': filepath,
+            'created_at': user_message.created_at.isoformat()
+        },
+        'ai_message': {
+            'id': ai_message.id,
+            'content': ai_message.content,
+            'type': ai_message.message_type,
+            'severity': ai_message.severity_level,
+            'created_at': ai_message.created_at.isoformat()
+        },
+        'transcript': transcript,
+        'session_title': chat_session.title
+    }
+
+job_queue.register('image_analysis', process_image_analysis_job)
+job_queue.register('audio_message', process_audio_message_job)
+job_queue.register_maintenance(lambda: sweep_temp_files(app.config['UPLOAD_FOLDER']))
+job_queue.register_maintenance(lambda: run_audit_maintenance(app))
+job_queue.register_maintenance(response_cache.prune)
+
+def get_user_job(job_id):
+    """Fetch a background job owned by the current user"""
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return None
+    return job
+
+def job_response(job):
+    """Serialize a background job for the client"""
+    data = {
+        'success': job['status'] != STATUS_FAILED,
+        'job_id': job['id'],
+        'status': job['status']
+    }
+    if job['status'] == STATUS_DONE:
+        data['result'] = job['result']
+    elif job['status'] == STATUS_FAILED:
+        data['error'] = job['error']
+    return data
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """API route to poll the status of a background job"""
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    return jsonify(job_response(job))
+
+@app.route('/api/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """API route to follow a background job over server-sent events"""
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    def generate():
+        last_status = None
+        deadline = time.time() + JOB_EVENTS_TIMEOUT
+        while time.time() < deadline:
+            current = job_queue.get(job_id)
+            if current is None:
+                yield sse_event('failed', {'success': False, 'error': 'Job not found'})
+                return
+            if current['status'] != last_status:
+                last_status = current['status']
+                yield sse_event('status', {'job_id': job_id, 'status': last_status})
+            if current['status'] in FINISHED_STATUSES:
+                yield sse_event('done' if current['status'] == STATUS_DONE else 'failed', job_response(current))
+                return
+            time.sleep(JOB_EVENTS_POLL_INTERVAL)
+        yield sse_event('timeout', {'job_id': job_id, 'status': last_status})
+
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/health-journal/add', methods=['POST'])
 @login_required
@@ -651,6 +975,7 @@ def add_health_log():
             description=data.get('description', '')
         )
         db.session.add(log)
+        record_log(log)
         db.session.commit()
 
         return jsonify({
@@ -675,6 +1000,7 @@ def delete_health_log(log_id):
     log = HealthLog.query.filter_by(id=log_id, user_id=current_user.id).first_or_404()
 
     try:
+        remove_log(log)
         db.session.delete(log)
         db.session.commit()
 
@@ -695,71 +1021,127 @@ def uploaded_image(filename):
     clean_filename = os.path.basename(filename)
     return send_from_directory(app.config['UPLOAD_FOLDER'], clean_filename)
 
+def export_user_info(user):
+    """Profile fields included at the top of a data export"""
+    return {
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'date_of_birth': user.date_of_birth.isoformat() if user.date_of_birth else None,
+        'gender': user.gender,
+        'created_at': user.created_at.isoformat()
+    }
+
+def export_health_log(log):
+    return {
+        'id': log.id,
+        'symptom': log.symptom,
+        'severity': log.severity,
+        'description': log.description,
+        'recorded_at': log.recorded_at.isoformat()
+    }
+
+def export_message(message):
+    return {
+        'id': message.id,
+        'is_user': message.is_user,
+        'content': message.content,
+        'message_type': message.message_type,
+        'health_analysis': message.health_analysis,
+        'severity_level': message.severity_level,
+        'created_at': message.created_at.isoformat()
+    }
+
+def export_session(chat_session):
+    return {
+        'id': chat_session.id,
+        'title': chat_session.title,
+        'created_at': chat_session.created_at.isoformat()
+    }
+
+def generate_export_json(user):
+    """Yield the export as one JSON document, piece by piece"""
+    yield '{"user_info": ' + json.dumps(export_user_info(user))
+
+    yield ', "health_logs": ['
+    for index, log in enumerate(iter_health_logs(user.id)):
+        yield (', ' if index else '') + json.dumps(export_health_log(log))
+
+    yield '], "chat_sessions": ['
+    for index, (chat_session, messages) in enumerate(iter_sessions_with_messages(user.id)):
+        session_json = json.dumps(export_session(chat_session))
+        yield (', ' if index else '') + session_json[:-1] + ', "messages": ['
+        for message_index, message in enumerate(messages):
+            yield (', ' if message_index else '') + json.dumps(export_message(message))
+        yield ']}'
+    yield ']}'
+
+def generate_export_ndjson(user):
+    """Yield the export as newline-delimited JSON, one typed record per line"""
+    yield json.dumps(dict(export_user_info(user), type='user_info')) + '\n'
+    for log in iter_health_logs(user.id):
+        yield json.dumps(dict(export_health_log(log), type='health_log')) + '\n'
+    for chat_session, messages in iter_sessions_with_messages(user.id):
+        yield json.dumps(dict(export_session(chat_session), type='chat_session')) + '\n'
+        for message in messages:
+            yield json.dumps(dict(export_message(message), type='chat_message',
+                                  session_id=chat_session.id)) + '\n'
+
+def buffered(chunks, size=EXPORT_CHUNK_SIZE):
+    """Join small string pieces into blocks of roughly `size` bytes"""
+    buffer = []
+    buffered_size = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        buffer.append(data)
+        buffered_size += len(data)
+        if buffered_size >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def gzipped(blocks):
+    """Compress a stream of byte blocks into a gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
 @app.route('/export-data')
 @login_required
 def export_data():
-    """Generate and download a user's health data in JSON format"""
-    try:
-        # Gather user data
-        user_data = {
-            'user_info': {
-                'username': current_user.username,
-                'email': current_user.email,
-                'first_name': current_user.first_name,
-                'last_name': current_user.last_name,
-                'date_of_birth': current_user.date_of_birth.isoformat() if current_user.date_of_birth else None,
-                'gender': current_user.gender,
-                'created_at': current_user.created_at.isoformat()
-            },
-            'health_logs': [],
-            'chat_sessions': []
-        }
-
-        # Get health logs
-        health_logs = HealthLog.query.filter_by(user_id=current_user.id).all()
-        for log in health_logs:
-            user_data['health_logs'].append({
-                'id': log.id,
-                'symptom': log.symptom,
-                'severity': log.severity,
-                'description': log.description,
-                'recorded_at': log.recorded_at.isoformat()
-            })
-
-        # Get chat sessions and messages
-        chat_sessions = ChatSession.query.filter_by(user_id=current_user.id).all()
-        for session in chat_sessions:
-            session_data = {
-                'id': session.id,
-                'title': session.title,
-                'created_at': session.created_at.isoformat(),
-                'messages': []
-            }
-
-            messages = ChatMessage.query.filter_by(session_id=session.id).order_by(ChatMessage.created_at).all()
-            for message in messages:
-                message_data = {
-                    'id': message.id,
-                    'is_user': message.is_user,
-                    'content': message.content,
-                    'message_type': message.message_type,
-                    'health_analysis': message.health_analysis,
-                    'severity_level': message.severity_level,
-                    'created_at': message.created_at.isoformat()
-                }
-                session_data['messages'].append(message_data)
-
-            user_data['chat_sessions'].append(session_data)
-
-        # Create JSON response with appropriate headers for download
-        response = jsonify(user_data)
-        response.headers.set('Content-Disposition', 'attachment', filename='health_data.json')
-        return response
-
-    except Exception as e:
-        logger.error(f"Error in export_data: {str(e)}")
-        flash('Failed to export data. Please try again.', 'danger')
+    """Stream a download of a user's health data as JSON or NDJSON, optionally gzipped"""
+    export_format = request.args.get('format', 'json')
+    if export_format not in ('json', 'ndjson'):
+        flash('Unsupported export format.', 'danger')
         return redirect(url_for('profile'))
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    user = current_user._get_current_object()
+    chunks = generate_export_ndjson(user) if export_format == 'ndjson' else generate_export_json(user)
+
+    def generate():
+        try:
+            blocks = buffered(chunks)
+            yield from gzipped(blocks) if compress else blocks
+        except Exception as e:
+            # Headers are already sent, so the download just ends early
+            logger.error(f"Error in export_data: {str(e)}")
+
+    filename = f"health_data.{export_format}" + ('.gz' if compress else '')
+    if compress:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
 
 @app.route('/api/metrics/log', methods=['POST'])
 @login_required
@@ -793,15 +1175,39 @@ def admin_dashboard():
         flash('Access denied', 'danger')
         return redirect(url_for('dashboard'))
 
-    # Get audit logs
+    # Get the latest audit logs (audit_logs only holds the current day; older days are partitioned)
     audit_logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(100).all()
 
+    # Request charts come from the hourly rollups rather than raw audit rows
+    audit_summary = rollup_summary()
+
     # Get server metrics
     server_metrics = load_balancer.get_metrics()
 
+    # Get outbound API latency stats
+    http_stats = http_client.get_stats()
+
+    # Get response cache hit/miss counters
+    cache_stats = response_cache.get_stats()
+
+    # Get per-backend transcription latency and success rate
+    transcription_stats = transcription_pipeline.get_stats()
+
+    # Get write-behind audit buffer counters for this worker
+    audit_stats = security_audit.get_stats()
+
+    # Get user loader cache hit rate for this worker
+    user_cache_stats = user_cache.get_stats()
+
     return render_template('admin.html',
                          audit_logs=audit_logs,
-                         server_metrics=server_metrics)
+                         server_metrics=server_metrics,
+                         http_stats=http_stats,
+                         cache_stats=cache_stats,
+                         transcription_stats=transcription_stats,
+                         audit_stats=audit_stats,
+                         audit_summary=audit_summary,
+                         user_cache_stats=user_cache_stats)
 
 def health_check():
     """Health check endpoint for monitoring"""
@@ -812,8 +1218,9 @@ def health_check():
         # Check Groq API
         groq_api_key = os.environ.get('GROQ_API_KEY')
         if groq_api_key:
-            response = requests.get(
+            response = http_client.get(
                 "https://api.groq.com/openai/v1/models",
+                name="groq.models",
                 headers={"Authorization": f"Bearer {groq_api_key}"}
             )
             groq_status = response.status_code == 200
@@ -845,14 +1252,14 @@ def health_analytics():
 def smart_symptom_analysis():
     """Smart symptom analysis endpoint"""
     try:
-        # Get user's health logs
-        health_logs = HealthLog.query.filter_by(user_id=current_user.id).all()
+        # Summarize each symptom from its running statistics instead of sending every log
         logs_data = [{
-            'symptom': log.symptom,
-            'severity': log.severity,
-            'description': log.description,
-            'recorded_at': log.recorded_at.isoformat()
-        } for log in health_logs]
+            'symptom': trend['symptom'],
+            'severity': round(trend['average_severity'], 1) if trend['average_severity'] is not None else None,
+            'description': (f"{trend['count']} entries; severity went from "
+                            f"{trend['first_severity']} to {trend['last_severity']}"),
+            'recorded_at': trend['last_recorded_at'].isoformat()
+        } for trend in symptom_trends(current_user.id)]
 
         # Analyze patterns
         analysis = analyze_symptoms_patterns(logs_data)
@@ -892,12 +1299,10 @@ def visual_symptom_analysis():
             'severity': log.severity
         } for log in symptom_history]
 
-        # Convert image to base64
+        # Analyze image with history, reusing the analysis for the same image and history
         image_data = file.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-
-        # Analyze image with history
-        analysis = analyze_image_with_history(base64_image, history_data)
+        analysis = get_or_create_analysis(hash_upload(image_data), history_prompt_version(history_data),
+                                          lambda: analyze_image_with_history(image_data, history_data))
 
         return jsonify({
             'success': True,
@@ -928,23 +1333,32 @@ def health_analytics_data():
             })
 
         # Get user's chat interactions
-        chat_sessions = ChatSession.query.filter_by(user_id=current_user.id).all()
-        messages_count = 0
-        for session in chat_sessions:
-            messages_count += ChatMessage.query.filter_by(session_id=session.id).count()
+        messages_count = count_user_messages(current_user.id)
 
         # Calculate days of usage
         days_of_usage = 0
         if current_user.created_at:
-            days_of_usage = (datetime.datetime.utcnow() - current_user.created_at).days
+            days_of_usage = (datetime.utcnow() - current_user.created_at).days
+
+        # Per-symptom summary and overall direction from the running symptom statistics
+        symptoms = [{
+            'symptom': trend['symptom'],
+            'count': trend['count'],
+            'average_severity': trend['average_severity'],
+            'first_severity': trend['first_severity'],
+            'last_severity': trend['last_severity']
+        } for trend in symptom_trends(current_user.id)]
+        changes = [trend['last_severity'] - trend['first_severity'] for trend in symptoms
+                   if trend['count'] >= 2 and None not in (trend['first_severity'], trend['last_severity'])]
 
         return jsonify({
             'success': True,
             'health_logs': logs_data,
+            'symptoms': symptoms,
             'interactions_count': messages_count,
             'days_of_usage': days_of_usage,
             'trends': {
-                'improving': len(logs_data) > 0
+                'improving': sum(change < 0 for change in changes) > sum(change > 0 for change in changes)
             }
         })
 
@@ -1011,11 +1425,11 @@ def health_predictions():
         # This would involve ML models in a production environment
         # Here we're generating insights based on actual user data
 
-        # Get health logs
-        health_logs = HealthLog.query.filter_by(user_id=current_user.id).all()
+        # Summarize health logs with grouped SQL
+        log_count, avg_severity = severity_summary(current_user.id)
 
         # Default predictions if not enough data
-        if len(health_logs) < 2:
+        if log_count < 2:
             return jsonify({
                 'success': True,
                 'predictions': [
@@ -1028,33 +1442,23 @@ def health_predictions():
                 ]
             })
 
-        # Get unique symptoms
-        symptoms = {}
-        for log in health_logs:
-            if log.symptom not in symptoms:
-                symptoms[log.symptom] = []
-            symptoms[log.symptom].append({
-                'severity': log.severity,
-                'date': log.recorded_at
-            })
-
         predictions = []
 
         # Analyze each symptom
-        for symptom, data in symptoms.items():
-            # Sort by date
-            data.sort(key=lambda x: x['date'])
+        for trend_data in symptom_trends(current_user.id):
+            symptom = trend_data['symptom']
 
             # Need at least 2 data points for a trend
-            if len(data) >= 2:
-                first_severity = data[0]['severity']
-                last_severity = data[-1]['severity']
+            if trend_data['count'] >= 2:
+                first_severity = trend_data['first_severity']
+                last_severity = trend_data['last_severity']
 
                 trend = 'stable'
-                if last_severity < first_severity:
-                    trend = 'improving'
-                elif last_severity > first_severity:
-                    trend = 'worsening'
+                if first_severity is not None and last_severity is not None:
+                    if last_severity < first_severity:
+                        trend = 'improving'
+                    elif last_severity > first_severity:
+                        trend = 'worsening'
 
                 # Generate prediction
                 if trend == 'improving':
@@ -1073,10 +1477,7 @@ def health_predictions():
                     })
 
         # Add a general observation if we have enough data points
-        if len(health_logs) >= 5:
-            # Calculate average severity
-            avg_severity = sum(log.severity for log in health_logs) / len(health_logs)
-
+        if log_count >= 5 and avg_severity is not None:
             if avg_severity < 4:
                 predictions.append({
                     'label': 'General Wellness',
@@ -1114,6 +1515,7 @@ def delete_account():
         ).delete(synchronize_session=False)
 
         ChatSession.query.filter_by(user_id=current_user.id).delete(synchronize_session=False)
+        SymptomStat.query.filter_by(user_id=current_user.id).delete(synchronize_session=False)
         HealthLog.query.filter_by(user_id=current_user.id).delete(synchronize_session=False)
 
         # Get user ID for logout
@@ -1125,6 +1527,7 @@ def delete_account():
         # Delete the user
         User.query.filter_by(id=user_id).delete()
         db.session.commit()
+        invalidate_user(user_id)
 
         flash('Your account has been successfully deleted.', 'success')
         return redirect(url_for('landing'))
@@ -1,17 +1,27 @@
 
 import os
 import json
+import time
+import atexit
 import logging
 import hashlib
+from collections import deque
 from datetime import datetime
+from threading import Event, Lock, Thread
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from flask import request
 from flask_login import current_user
 from models import db, User
+from audit_retention import record_rollups
 
 logger = logging.getLogger(__name__)
 
+# Write-behind buffer settings (override via environment)
+AUDIT_BUFFER_SIZE = int(os.environ.get("AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_FLUSH_BATCH = int(os.environ.get("AUDIT_FLUSH_BATCH", "200"))
+AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get("AUDIT_FLUSH_INTERVAL_MS", "1000"))
+
 @dataclass
 class AuditEvent:
     event_type: str
@@ -24,39 +34,144 @@ class AuditEvent:
     details: Dict
 
 class SecurityAudit:
-    def __init__(self):
-        self.events: List[AuditEvent] = []
-        
+    """
+    Write-behind audit logger
+
+    Requests only append to a bounded in-memory ring buffer; a background
+    thread bulk-inserts the buffered events every AUDIT_FLUSH_BATCH events
+    or AUDIT_FLUSH_INTERVAL_MS, whichever comes first. When the buffer is
+    full the oldest event is dropped and counted rather than blocking the
+    request. Remaining events are flushed when the process exits.
+    """
+
+    def __init__(self, buffer_size: int = AUDIT_BUFFER_SIZE):
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._app = None
+        self._pid = None
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        atexit.register(self.stop)
+
     def log_event(self, event_type: str, status_code: int = 200, details: Dict = None):
         event = AuditEvent(
             event_type=event_type,
             user_id=current_user.id if not current_user.is_anonymous else None,
-            ip_address=request.remote_addr,
+            ip_address=request.remote_addr or '',
             endpoint=request.endpoint or '',
             method=request.method,
             status_code=status_code,
             timestamp=datetime.utcnow(),
             details=details or {}
         )
-        self.events.append(event)
-        self._persist_event(event)
-    
-    def _persist_event(self, event: AuditEvent):
+        self._ensure_flusher()
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+            backlog = len(self._buffer)
+        if backlog >= AUDIT_FLUSH_BATCH:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Bulk-insert everything buffered so far; returns the number of rows written"""
+        # Before start() there is no app to write through; events wait in the buffer
+        if self._app is None:
+            return 0
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+        if not events:
+            return 0
+
+        from models import AuditLog
+        rows = [{
+            'event_type': event.event_type,
+            'user_id': event.user_id,
+            'ip_address': event.ip_address,
+            'endpoint': event.endpoint,
+            'method': event.method,
+            'status_code': event.status_code,
+            'details': json.dumps(event.details),
+            'created_at': event.timestamp
+        } for event in events]
+
+        start_time = time.time()
         try:
-            from models import AuditLog
-            audit_log = AuditLog(
-                event_type=event.event_type,
-                user_id=event.user_id,
-                ip_address=event.ip_address,
-                endpoint=event.endpoint,
-                method=event.method,
-                status_code=event.status_code,
-                details=json.dumps(event.details)
-            )
-            db.session.add(audit_log)
-            db.session.commit()
+            with self._app.app_context():
+                db.session.execute(db.insert(AuditLog), rows)
+                # Hourly rollups are updated in the same transaction so they never drift from the log
+                record_rollups(events)
+                db.session.commit()
         except Exception as e:
-            logger.error(f"Failed to persist audit event: {str(e)}")
+            with self._app.app_context():
+                db.session.rollback()
+            with self._lock:
+                self.failed += len(rows)
+            logger.error(f"Failed to persist {len(rows)} audit events: {str(e)}")
+            return 0
+
+        with self._lock:
+            self.flushed += len(rows)
+            self.flushes += 1
+            self.last_flush_ms = (time.time() - start_time) * 1000
+        return len(rows)
+
+    def _flusher_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(AUDIT_FLUSH_INTERVAL_MS / 1000)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit flusher error: {str(e)}")
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork, so a preloaded app restarts the flusher in each worker
+        if self._app is not None and self._pid != os.getpid():
+            # The parent's lock may have been held mid-flush; events buffered before the fork are its own
+            self._lock = Lock()
+            self._buffer.clear()
+            self._thread = None
+            self.start(self._app)
+
+    def start(self, app):
+        """Start the background flusher for this process"""
+        if self._thread and self._pid == os.getpid():
+            return
+        self._app = app
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = Thread(target=self._flusher_loop, name="audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher and write out whatever is still buffered"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self._thread = None
+        if self._pid == os.getpid():
+            self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'backlog': len(self._buffer),
+                'capacity': self._buffer.maxlen,
+                'dropped': self.dropped,
+                'flushed': self.flushed,
+                'failed': self.failed,
+                'flushes': self.flushes,
+                'last_flush_ms': self.last_flush_ms
+            }
 
 # Global security audit instance
 security_audit = SecurityAudit()
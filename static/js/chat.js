@@ -30,9 +30,15 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Scroll chat to bottom on load
     scrollChatToBottom();
+
+    // Load older messages and sessions as the user scrolls
+    setupHistoryPaging(chatContainer);
   }
 });
 
+// Distance from the edge of a list (px) at which the next page is requested
+const PAGE_SCROLL_THRESHOLD = 100;
+
 // Function to send a chat message
 function sendChatMessage(message) {
   // Show loading state in the chat
@@ -51,6 +57,115 @@ function sendChatMessage(message) {
   chatContainer.appendChild(loadingMessage);
   chatContainer.scrollTop = chatContainer.scrollHeight;
 
+  // Stream the response from the server, falling back to the JSON endpoint
+  streamChatMessage(message, loadingMessage)
+    .catch(error => {
+      console.warn('Streaming unavailable, falling back:', error);
+      sendChatMessageJson(message, loadingMessage);
+    });
+}
+
+// Function to stream a chat message response over server-sent events
+async function streamChatMessage(message, loadingMessage) {
+  const response = await fetch('/api/chat/stream-message', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({
+      message: message
+    })
+  });
+
+  const contentType = response.headers.get('Content-Type') || '';
+  if (!response.ok || !response.body || !contentType.includes('text/event-stream')) {
+    throw new Error(`Unexpected streaming response (${response.status})`);
+  }
+
+  const chatContainer = document.querySelector('.chat-container');
+
+  // Placeholder AI message that fills in as tokens arrive
+  const streamingMessage = document.createElement('div');
+  streamingMessage.className = 'message ai-message streaming';
+  streamingMessage.innerHTML = `
+    <div class="message-avatar">
+      <i class="bi bi-robot"></i>
+    </div>
+    <div class="message-content">
+      <p class="message-text"></p>
+      <div class="message-time">Typing...</div>
+    </div>
+  `;
+  chatContainer.appendChild(streamingMessage);
+  const streamingText = streamingMessage.querySelector('.message-text');
+
+  const reader = response.body.getReader();
+  try {
+    await readChatStream(reader, chatContainer, loadingMessage, streamingMessage, streamingText);
+  } catch (error) {
+    // The user message is already stored, so don't retry through the JSON endpoint
+    console.error('Error reading response stream:', error);
+    loadingMessage.remove();
+    streamingMessage.remove();
+    showError('The response was interrupted. Please check your connection and try again.');
+  }
+}
+
+// Function to read SSE frames from the chat response stream
+async function readChatStream(reader, chatContainer, loadingMessage, streamingMessage, streamingText) {
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let streamedText = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE frames are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let eventName = 'message';
+      let dataLines = [];
+      frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+          eventName = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trim());
+        }
+      });
+      if (dataLines.length === 0) continue;
+      const data = JSON.parse(dataLines.join('\n'));
+
+      if (eventName === 'token') {
+        streamedText += data.content;
+        streamingText.innerHTML = formatMessageText(streamedText);
+        chatContainer.scrollTop = chatContainer.scrollHeight;
+      } else if (eventName === 'done') {
+        // Replace the placeholders with the stored messages
+        loadingMessage.remove();
+        streamingMessage.remove();
+        updateChatWithMessage(data);
+
+        if (data.session_title) {
+          updateSessionTitle(data.session_title);
+        }
+      } else if (eventName === 'error') {
+        loadingMessage.remove();
+        streamingMessage.remove();
+        showError(data.error || 'Failed to send message. Please try again.');
+      }
+    }
+  }
+}
+
+// Function to send a chat message and wait for the full JSON response
+function sendChatMessageJson(message, loadingMessage) {
   // Send the message to the server
   fetch('/api/chat/send-message', {
     method: 'POST',
@@ -256,36 +371,167 @@ function createNewSession() {
 
 // Function to set up session click handlers
 function setupSessionHandlers() {
-  // Session item click
-  document.querySelectorAll('.session-item').forEach(item => {
-    // Select session
-    item.addEventListener('click', function(event) {
-      if (!event.target.closest('.session-actions')) {
-        const sessionId = this.dataset.sessionId;
-        selectSession(sessionId);
-      }
-    });
+  document.querySelectorAll('.session-item').forEach(bindSessionItem);
+}
 
-    // Rename session
-    const renameBtn = item.querySelector('.rename-session-btn');
-    if (renameBtn) {
-      renameBtn.addEventListener('click', function(event) {
-        event.stopPropagation();
-        const sessionId = this.closest('.session-item').dataset.sessionId;
-        promptRenameSession(sessionId);
-      });
+// Function to attach click handlers to one session item
+function bindSessionItem(item) {
+  // Select session
+  item.addEventListener('click', function(event) {
+    if (!event.target.closest('.session-actions')) {
+      const sessionId = this.dataset.sessionId;
+      selectSession(sessionId);
     }
+  });
 
-    // Delete session
-    const deleteBtn = item.querySelector('.delete-session-btn');
-    if (deleteBtn) {
-      deleteBtn.addEventListener('click', function(event) {
-        event.stopPropagation();
-        const sessionId = this.closest('.session-item').dataset.sessionId;
-        confirmDeleteSession(sessionId);
-      });
+  // Rename session
+  const renameBtn = item.querySelector('.rename-session-btn');
+  if (renameBtn) {
+    renameBtn.addEventListener('click', function(event) {
+      event.stopPropagation();
+      const sessionId = this.closest('.session-item').dataset.sessionId;
+      promptRenameSession(sessionId);
+    });
+  }
+
+  // Delete session
+  const deleteBtn = item.querySelector('.delete-session-btn');
+  if (deleteBtn) {
+    deleteBtn.addEventListener('click', function(event) {
+      event.stopPropagation();
+      const sessionId = this.closest('.session-item').dataset.sessionId;
+      confirmDeleteSession(sessionId);
+    });
+  }
+}
+
+// Function to set up infinite scrolling for messages and sessions
+function setupHistoryPaging(chatContainer) {
+  chatContainer.addEventListener('scroll', function() {
+    if (chatContainer.scrollTop < PAGE_SCROLL_THRESHOLD) {
+      loadOlderMessages(chatContainer);
     }
   });
+
+  const sessionList = document.querySelector('.sidebar-content');
+  if (sessionList) {
+    sessionList.addEventListener('scroll', function() {
+      const remaining = sessionList.scrollHeight - sessionList.scrollTop - sessionList.clientHeight;
+      if (remaining < PAGE_SCROLL_THRESHOLD) {
+        loadMoreSessions(sessionList);
+      }
+    });
+  }
+}
+
+// Function to fetch the next page for a list whose cursor is stored in data-next-cursor
+function fetchNextPage(list, url) {
+  const cursor = list.dataset.nextCursor;
+  if (!cursor || list.dataset.loading) {
+    return Promise.resolve(null);
+  }
+
+  list.dataset.loading = 'true';
+  return fetch(`${url}?cursor=${encodeURIComponent(cursor)}`)
+    .then(response => response.json())
+    .then(data => {
+      if (!data.success) {
+        throw new Error(data.error || 'Failed to load page');
+      }
+      list.dataset.nextCursor = data.next_cursor || '';
+      return data;
+    })
+    .finally(() => {
+      delete list.dataset.loading;
+    });
+}
+
+// Function to prepend the previous page of messages, keeping the current view in place
+function loadOlderMessages(chatContainer) {
+  const sessionId = chatContainer.dataset.sessionId;
+  fetchNextPage(chatContainer, `/api/chat/sessions/${sessionId}/messages`)
+    .then(data => {
+      if (!data) return;
+
+      const previousHeight = chatContainer.scrollHeight;
+      const fragment = document.createDocumentFragment();
+      data.messages.forEach(message => fragment.appendChild(createHistoryMessage(message)));
+      chatContainer.insertBefore(fragment, chatContainer.firstChild);
+      chatContainer.scrollTop += chatContainer.scrollHeight - previousHeight;
+    })
+    .catch(error => {
+      console.error('Error loading older messages:', error);
+    });
+}
+
+// Function to append the next page of sessions to the sidebar
+function loadMoreSessions(sessionList) {
+  fetchNextPage(sessionList, '/api/chat/sessions')
+    .then(data => {
+      if (!data) return;
+
+      data.sessions.forEach(chatSession => {
+        const item = createSessionItem(chatSession);
+        sessionList.appendChild(item);
+        bindSessionItem(item);
+      });
+    })
+    .catch(error => {
+      console.error('Error loading sessions:', error);
+    });
+}
+
+// Function to build a stored message element, matching the dashboard template
+function createHistoryMessage(message) {
+  const element = document.createElement('div');
+  element.className = `message ${message.is_user ? 'user-message' : 'ai-message'}`;
+
+  let severityIndicator = '';
+  if (!message.is_user && message.severity > 0) {
+    const severityClass = message.severity >= 3 ? 'severity-high' :
+                         (message.severity >= 2 ? 'severity-medium' : 'severity-low');
+    severityIndicator = `<span class="severity-indicator ${severityClass}"></span>`;
+  }
+
+  let attachment = '';
+  if (message.message_type === 'image' && message.image_url) {
+    attachment = `<div class="image-message"><img src="${message.image_url}" alt="Uploaded image"></div>`;
+  } else if (message.message_type === 'voice' && message.audio_url) {
+    attachment = `<audio controls src="${message.audio_url}" class="mt-2 w-100"></audio>`;
+  }
+
+  element.innerHTML = `
+    <div class="message-avatar">
+      <i class="bi ${message.is_user ? 'bi-person-fill' : 'bi-robot'}"></i>
+    </div>
+    <div class="message-content">
+      <p class="message-text"></p>
+      ${attachment}
+      <div class="message-time">${severityIndicator}${formatDateTime(message.created_at)}</div>
+    </div>
+  `;
+  element.querySelector('.message-text').textContent = message.content;
+  return element;
+}
+
+// Function to build a sidebar session item, matching the dashboard template
+function createSessionItem(chatSession) {
+  const item = document.createElement('div');
+  item.className = 'session-item';
+  item.dataset.sessionId = chatSession.id;
+  item.innerHTML = `
+    <div class="session-title"></div>
+    <div class="session-actions">
+      <button class="btn btn-sm btn-link rename-session-btn" title="Rename">
+        <i class="bi bi-pencil"></i>
+      </button>
+      <button class="btn btn-sm btn-link delete-session-btn" title="Delete">
+        <i class="bi bi-trash"></i>
+      </button>
+    </div>
+  `;
+  item.querySelector('.session-title').textContent = chatSession.title;
+  return item;
 }
 
 // Function to select a session
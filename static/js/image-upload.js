@@ -133,6 +133,14 @@ function uploadImage(file) {
     body: formData
   })
   .then(response => response.json())
+  .then(data => {
+    // Analysis runs as a background job; wait for the stored messages
+    if (data.success && data.job_id) {
+      loadingMessage.querySelector('.message-text').textContent = 'Analyzing image...';
+      return waitForJob(data);
+    }
+    return data;
+  })
   .then(data => {
     // Remove loading message
     loadingMessage.remove();
@@ -136,6 +136,34 @@ function formatDate(dateString) {
   return date.toLocaleDateString();
 }
 
+// Function to wait for a background job (202 response) and resolve with its result
+function waitForJob(job, interval = 1000, timeout = 180000) {
+  const startedAt = Date.now();
+
+  return new Promise((resolve, reject) => {
+    function poll() {
+      fetch(job.status_url || `/api/jobs/${job.job_id}`)
+        .then(response => response.json())
+        .then(data => {
+          if (data.status === 'done') {
+            resolve(data.result);
+          } else if (data.status === 'failed' || data.success === false) {
+            reject(new Error(data.error || 'Processing failed'));
+          } else if (Date.now() - startedAt > timeout) {
+            reject(new Error('Processing is taking longer than expected'));
+          } else {
+            // Back off gently while the job is queued or running
+            interval = Math.min(interval * 1.5, 5000);
+            setTimeout(poll, interval);
+          }
+        })
+        .catch(reject);
+    }
+
+    setTimeout(poll, interval);
+  });
+}
+
 // Function to show loading state
 function showLoading(element, text = 'Loading...') {
   if (!element) return;
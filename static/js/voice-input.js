@@ -5,6 +5,12 @@ let audioChunks = [];
 let isRecording = false;
 let recordingTimeout;
 let stream; // Added: Declare stream variable
+let audioUpload = null; // Chunked upload for the current recording
+let uploadChain = Promise.resolve(); // Chunks are sent one at a time, in order
+let recordingCancelled = false;
+
+// MediaRecorder emits a chunk this often while recording (ms)
+const AUDIO_CHUNK_INTERVAL = 1000;
 
 document.addEventListener('DOMContentLoaded', function() {
   const startRecordingBtn = document.getElementById('start-recording');
@@ -27,6 +33,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Cancel recording when button is clicked
     cancelButton.addEventListener('click', () => {
       if (mediaRecorder) {
+        recordingCancelled = true;
         mediaRecorder.stop();
         stream.getTracks().forEach(track => track.stop());
         stream = null;
@@ -70,10 +77,18 @@ async function startRecording() {
 
     // Clear previous recordings
     audioChunks = [];
+    recordingCancelled = false;
+
+    // Open a chunked upload so audio streams to the server while recording
+    audioUpload = createAudioUpload(mediaRecorder.mimeType);
+    uploadChain = audioUpload.promise;
 
     // Set up event handling
     mediaRecorder.addEventListener('dataavailable', event => {
+      if (!event.data || event.data.size === 0) return;
       audioChunks.push(event.data);
+      const upload = audioUpload;
+      uploadChain = uploadChain.then(() => appendAudioChunk(upload, event.data));
     });
 
     // When recording stops
@@ -81,8 +96,12 @@ async function startRecording() {
       isRecording = false;
       clearTimeout(recordingTimeout);
 
-      // Process the recorded audio
-      processAudio();
+      // Process the recorded audio, or drop it if the recording was cancelled
+      if (recordingCancelled) {
+        discardAudioUpload(audioUpload);
+      } else {
+        processAudio();
+      }
 
       // Reset UI
       startBtn.style.display = 'inline-block';
@@ -91,8 +110,8 @@ async function startRecording() {
       if (recordingIndicator) recordingIndicator.style.display = 'none';
     });
 
-    // Start recording
-    mediaRecorder.start();
+    // Start recording, emitting a chunk every AUDIO_CHUNK_INTERVAL ms
+    mediaRecorder.start(AUDIO_CHUNK_INTERVAL);
     isRecording = true;
 
     // Update UI
@@ -127,53 +146,125 @@ function stopRecording() {
   }
 }
 
+// File extension matching the recorder's container format
+function audioExtension(mimeType) {
+  if (!mimeType) return 'webm';
+  if (mimeType.includes('ogg')) return 'ogg';
+  if (mimeType.includes('mp4')) return 'm4a';
+  if (mimeType.includes('wav')) return 'wav';
+  return 'webm';
+}
+
+// Start a chunked upload; chunks are appended to it as the recorder produces them
+function createAudioUpload(mimeType) {
+  const upload = { id: null, offset: 0, mimeType: mimeType, extension: audioExtension(mimeType) };
+
+  upload.promise = fetch('/api/chat/audio-uploads', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ filename: `recording.${upload.extension}` })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (!data.success) {
+      throw new Error(data.error || 'Could not start audio upload');
+    }
+    upload.id = data.upload_id;
+    upload.chunkUrl = data.chunk_url;
+    upload.commitUrl = data.commit_url;
+  });
+
+  return upload;
+}
+
+// Append one recorded chunk at the current offset
+function appendAudioChunk(upload, chunk) {
+  return fetch(`${upload.chunkUrl}?offset=${upload.offset}`, {
+    method: 'PUT',
+    headers: {
+      'Content-Type': 'application/octet-stream',
+    },
+    body: chunk
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (!data.success) {
+      throw new Error(data.error || 'Could not upload audio');
+    }
+    upload.offset = data.received;
+  });
+}
+
+// Cancel a chunked upload once its pending chunks have settled
+function discardAudioUpload(upload) {
+  if (!upload) return;
+  uploadChain
+    .catch(() => {})
+    .then(() => {
+      if (upload.id) {
+        fetch(`/api/chat/audio-uploads/${upload.id}`, { method: 'DELETE' });
+      }
+    });
+}
+
 // Function to process the recorded audio
 function processAudio() {
   if (audioChunks.length === 0) {
     showError('No audio recorded. Please try again.');
+    discardAudioUpload(audioUpload);
     return;
   }
 
-  // Convert audio chunks to blob
-  const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
-
-  // Convert blob to base64
-  const reader = new FileReader();
-  reader.readAsDataURL(audioBlob);
-
-  reader.onloadend = function() {
-    const base64Audio = reader.result;
+  // Show sending indicator
+  const chatContainer = document.querySelector('.chat-container');
+  const loadingMessage = document.createElement('div');
+  loadingMessage.className = 'message user-message loading';
+  loadingMessage.innerHTML = `
+    <div class="message-content">
+      <p class="message-text">Sending audio...</p>
+    </div>
+  `;
+  chatContainer.appendChild(loadingMessage);
+  chatContainer.scrollTop = chatContainer.scrollHeight;
 
-    // Show sending indicator
-    const chatContainer = document.querySelector('.chat-container');
-    const loadingMessage = document.createElement('div');
-    loadingMessage.className = 'message user-message loading';
-    loadingMessage.innerHTML = `
-      <div class="message-content">
-        <p class="message-text">Sending audio...</p>
-      </div>
-    `;
-    chatContainer.appendChild(loadingMessage);
-    chatContainer.scrollTop = chatContainer.scrollHeight;
+  const upload = audioUpload;
+  const chunks = audioChunks;
+
+  // Most of the audio is already on the server; commit the upload to start transcription
+  const request = uploadChain
+    .then(() => fetch(upload.commitUrl, { method: 'POST' }))
+    .then(response => response.json())
+    .catch(error => {
+      // Streaming failed part-way; send the whole recording in one request instead
+      console.warn('Chunked audio upload failed, sending the full recording:', error);
+      discardAudioUpload(upload);
+      const formData = new FormData();
+      formData.append('audio', new Blob(chunks, { type: upload.mimeType || 'audio/webm' }),
+                      `recording.${upload.extension}`);
+      return fetch('/api/chat/send-audio', {
+        method: 'POST',
+        body: formData
+      }).then(response => response.json());
+    });
 
-    // Send the audio to the server
-    sendAudioToServer(base64Audio, loadingMessage);
-  };
+  handleAudioResponse(request, loadingMessage);
 }
 
-// Function to send audio to the server
-function sendAudioToServer(audioData, loadingElement) {
-  // Make API request to process audio
-  fetch('/api/chat/send-audio', {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-    },
-    body: JSON.stringify({
-      audio_data: audioData
-    })
+// Function to wait for the transcription job and show its result
+function handleAudioResponse(request, loadingElement) {
+  request
+  .then(data => {
+    // Transcription runs as a background job; wait for the stored messages
+    if (data.success && data.job_id) {
+      if (loadingElement) {
+        loadingElement.querySelector('.message-text').textContent = 'Transcribing audio...';
+      }
+      return waitForJob(data);
+    }
+    return data;
   })
-  .then(response => response.json())
   .then(data => {
     // Remove loading message
     if (loadingElement) {
@@ -0,0 +1,181 @@
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from models import HealthLog, SymptomStat
+
+logger = logging.getLogger(__name__)
+
+# symptom_stats holds one row per (user, normalized symptom) with running
+# count, severity sum and the first/last log in (recorded_at, id) order.
+# Writers call record_log/remove_log inside the transaction that changes
+# the health log, so the statistics commit or roll back with it.
+
+STAT_FIELDS = ('symptom', 'count', 'severity_count', 'severity_sum',
+               'first_log_id', 'first_severity', 'first_recorded_at',
+               'last_log_id', 'last_severity', 'last_recorded_at')
+
+def normalize_symptom(symptom: str) -> str:
+    """Key under which differently typed labels ("Headache ", "headache") are counted together"""
+    # Same as symptom_key_sql(): SQL trim() only strips spaces
+    return (symptom or "").strip(" ").lower()
+
+def symptom_key_sql():
+    """normalize_symptom(HealthLog.symptom) as a SQL expression"""
+    return func.lower(func.trim(HealthLog.symptom))
+
+def _log_values(log: HealthLog) -> Dict[str, Any]:
+    """Statistics row for a symptom with this single log"""
+    return {
+        'symptom': log.symptom.strip(),
+        'count': 1,
+        'severity_count': 0 if log.severity is None else 1,
+        'severity_sum': log.severity or 0,
+        'first_log_id': log.id,
+        'first_severity': log.severity,
+        'first_recorded_at': log.recorded_at,
+        'last_log_id': log.id,
+        'last_severity': log.severity,
+        'last_recorded_at': log.recorded_at
+    }
+
+def record_log(log: HealthLog):
+    """
+    Fold a newly added health log into its symptom's statistics
+
+    The log is flushed first so its id and recorded_at are known. The
+    update is a single upsert, so concurrent requests adding the same
+    symptom can't lose counts. The caller commits.
+    """
+    db.session.flush()
+    insert = postgresql_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(SymptomStat).values(
+        user_id=log.user_id, symptom_key=normalize_symptom(log.symptom), **_log_values(log)
+    )
+    new = statement.excluded
+    is_first = or_(SymptomStat.first_recorded_at > new.first_recorded_at,
+                   and_(SymptomStat.first_recorded_at == new.first_recorded_at,
+                        SymptomStat.first_log_id > new.first_log_id))
+    is_last = or_(SymptomStat.last_recorded_at < new.last_recorded_at,
+                  and_(SymptomStat.last_recorded_at == new.last_recorded_at,
+                       SymptomStat.last_log_id < new.last_log_id))
+
+    updates = {
+        'count': SymptomStat.count + new['count'],
+        'severity_count': SymptomStat.severity_count + new.severity_count,
+        'severity_sum': SymptomStat.severity_sum + new.severity_sum,
+        'symptom': case((is_last, new.symptom), else_=SymptomStat.symptom),
+    }
+    for field in ('log_id', 'severity', 'recorded_at'):
+        updates[f'first_{field}'] = case((is_first, new[f'first_{field}']), else_=getattr(SymptomStat, f'first_{field}'))
+        updates[f'last_{field}'] = case((is_last, new[f'last_{field}']), else_=getattr(SymptomStat, f'last_{field}'))
+
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'symptom_key'], set_=updates
+    ))
+
+def _summarize(logs: Iterable[HealthLog]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+    """Statistics rows keyed by (user id, symptom key) for logs in (recorded_at, id) order"""
+    stats: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for log in logs:
+        key = (log.user_id, normalize_symptom(log.symptom))
+        stat = stats.get(key)
+        if stat is None:
+            stats[key] = _log_values(log)
+            continue
+        stat['count'] += 1
+        if log.severity is not None:
+            stat['severity_count'] += 1
+            stat['severity_sum'] += log.severity
+        stat.update(symptom=log.symptom.strip(), last_log_id=log.id,
+                    last_severity=log.severity, last_recorded_at=log.recorded_at)
+    return stats
+
+def endpoint_log_query(user_id: int, symptom_key: str, exclude_id: int, last: bool):
+    """The symptom's logs other than exclude_id, first (or last) in (recorded_at, id) order first"""
+    order = (HealthLog.recorded_at.desc(), HealthLog.id.desc()) if last else (HealthLog.recorded_at, HealthLog.id)
+    return HealthLog.query.filter(
+        HealthLog.user_id == user_id,
+        HealthLog.id != exclude_id,
+        symptom_key_sql() == symptom_key
+    ).order_by(*order)
+
+def remove_log(log: HealthLog):
+    """
+    Take a health log out of its symptom's statistics; call before deleting it
+
+    Counts and sums are decremented in SQL. Only when the log was the
+    symptom's first or last entry is the new endpoint looked up, one row
+    from each end that changed. The caller commits.
+    """
+    symptom_key = normalize_symptom(log.symptom)
+    stat = SymptomStat.query.filter_by(user_id=log.user_id, symptom_key=symptom_key).first()
+    if stat is None:
+        return
+    if stat.count <= 1:
+        db.session.delete(stat)
+        return
+
+    was_first, was_last = log.id == stat.first_log_id, log.id == stat.last_log_id
+    stat.count = SymptomStat.count - 1
+    if log.severity is not None:
+        stat.severity_count = SymptomStat.severity_count - 1
+        stat.severity_sum = SymptomStat.severity_sum - log.severity
+
+    for is_last, changed in ((False, was_first), (True, was_last)):
+        if not changed:
+            continue
+        endpoint = endpoint_log_query(log.user_id, symptom_key, log.id, is_last).first()
+        if endpoint is None:
+            # The row had drifted from the logs; rebuild-symptom-stats recreates it if needed
+            logger.warning(f"[SymptomStats] No remaining logs for {stat}; dropping it")
+            db.session.delete(stat)
+            return
+        prefix = 'last' if is_last else 'first'
+        setattr(stat, f'{prefix}_log_id', endpoint.id)
+        setattr(stat, f'{prefix}_severity', endpoint.severity)
+        setattr(stat, f'{prefix}_recorded_at', endpoint.recorded_at)
+        if is_last:
+            stat.symptom = endpoint.symptom.strip()
+
+def rebuild_symptom_stats(user_id: Optional[int] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Recompute symptom statistics from health logs and repair any drift
+
+    Rows that already match are left alone; missing rows are inserted,
+    wrong ones corrected and rows without logs deleted.
+
+    Returns:
+        Counts of checked, inserted, updated and deleted rows
+    """
+    logs = HealthLog.query.order_by(HealthLog.user_id, HealthLog.recorded_at, HealthLog.id)
+    stats = SymptomStat.query
+    if user_id is not None:
+        logs = logs.filter_by(user_id=user_id)
+        stats = stats.filter_by(user_id=user_id)
+
+    expected = _summarize(logs.yield_per(500))
+    result = {'checked': 0, 'inserted': 0, 'updated': 0, 'deleted': 0}
+    for stat in stats.all():
+        result['checked'] += 1
+        values = expected.pop((stat.user_id, stat.symptom_key), None)
+        if values is None:
+            result['deleted'] += 1
+            if not dry_run:
+                db.session.delete(stat)
+        elif any(getattr(stat, field) != values[field] for field in STAT_FIELDS):
+            result['updated'] += 1
+            if not dry_run:
+                for field in STAT_FIELDS:
+                    setattr(stat, field, values[field])
+
+    result['inserted'] = len(expected)
+    if not dry_run:
+        for (stat_user_id, symptom_key), values in expected.items():
+            db.session.add(SymptomStat(user_id=stat_user_id, symptom_key=symptom_key, **values))
+        db.session.commit()
+    return result
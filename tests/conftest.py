@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Run against a scratch database and job queue; set before app is imported
+TEST_DIR = tempfile.mkdtemp(prefix="health-app-tests-")
+os.environ.setdefault("SESSION_SECRET", "test-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(TEST_DIR, 'health_app.db')}")
+os.environ.setdefault("JOB_QUEUE_DB", os.path.join(TEST_DIR, "jobs.db"))
+os.environ.setdefault("JOB_WORKERS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
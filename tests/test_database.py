@@ -0,0 +1,45 @@
+import database
+from database import create_tuned_engine, database_url, engine_options
+
+
+def test_database_url_defaults_to_sqlite_file(tmp_path, monkeypatch):
+    path = tmp_path / "instance" / "health_app.db"
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(database, "DEFAULT_SQLITE_PATH", str(path))
+
+    assert database_url() == f"sqlite:///{path}"
+    assert path.parent.is_dir()
+
+
+def test_database_url_from_environment(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://user:secret@db/health")
+    assert database_url() == "postgresql://user:secret@db/health"
+
+    monkeypatch.setenv("DATABASE_URL", "postgres://user:secret@db/health")
+    assert database_url() == "postgresql://user:secret@db/health"
+
+
+def test_engine_options():
+    assert engine_options("sqlite:///health_app.db") == {}
+
+    options = engine_options("postgresql://user:secret@db/health")
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["max_overflow"] == database.DB_MAX_OVERFLOW
+    assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+    assert options["pool_pre_ping"] is True
+
+
+def test_sqlite_pragmas(tmp_path):
+    engine = create_tuned_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    try:
+        with engine.connect() as conn:
+            def pragma(name):
+                return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == database.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma("cache_size") == -database.SQLITE_CACHE_SIZE_KB
+            assert conn.exec_driver_sql("SELECT lower('ÜBEL')").scalar() == "übel"
+    finally:
+        engine.dispose()
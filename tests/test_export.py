@@ -0,0 +1,81 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from app import db
+from models import ChatMessage, ChatSession, HealthLog, User
+
+
+def create_user_with_history():
+    name = uuid.uuid4().hex[:12]
+    user = User(username=name, email=f"{name}@example.com")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.flush()
+
+    start = datetime(2026, 1, 1, 9, 0)
+    for day in range(3):
+        db.session.add(HealthLog(user_id=user.id, symptom="Headache", severity=day + 2,
+                                 description=f"Day {day}", recorded_at=start + timedelta(days=day)))
+    for index in range(2):
+        chat_session = ChatSession(user_id=user.id, title=f"Session {index}",
+                                   created_at=start + timedelta(hours=index))
+        db.session.add(chat_session)
+        db.session.flush()
+        for turn in range(2):
+            db.session.add(ChatMessage(session_id=chat_session.id, is_user=turn == 0,
+                                       content=f"Message {index}.{turn}", severity_level=0,
+                                       created_at=start + timedelta(hours=index, minutes=turn)))
+    db.session.commit()
+    return user.id
+
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+
+
+def test_ndjson_gzip_export_round_trip(app, client):
+    with app.app_context():
+        user_id = create_user_with_history()
+    log_in(client, user_id)
+
+    response = client.get("/export-data?format=ndjson&gzip=1")
+    assert response.status_code == 200
+    assert response.mimetype == "application/gzip"
+    assert "health_data.ndjson.gz" in response.headers["Content-Disposition"]
+
+    lines = gzip.decompress(response.data).decode("utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["type"] for record in records] == [
+        "user_info",
+        "health_log", "health_log", "health_log",
+        "chat_session", "chat_message", "chat_message",
+        "chat_session", "chat_message", "chat_message",
+    ]
+
+    logs = [record for record in records if record["type"] == "health_log"]
+    assert [log["severity"] for log in logs] == [2, 3, 4]
+
+    sessions = [record for record in records if record["type"] == "chat_session"]
+    messages = [record for record in records if record["type"] == "chat_message"]
+    assert [record["title"] for record in sessions] == ["Session 0", "Session 1"]
+    assert [message["content"] for message in messages] == [
+        "Message 0.0", "Message 0.1", "Message 1.0", "Message 1.1"
+    ]
+    assert all(message["session_id"] == sessions[index // 2]["id"] for index, message in enumerate(messages))
+
+
+def test_json_export_matches_ndjson(app, client):
+    with app.app_context():
+        user_id = create_user_with_history()
+    log_in(client, user_id)
+
+    document = json.loads(client.get("/export-data").data)
+    records = [json.loads(line) for line in client.get("/export-data?format=ndjson").data.splitlines()]
+
+    assert document["user_info"] == {key: value for key, value in records[0].items() if key != "type"}
+    assert len(document["health_logs"]) == sum(record["type"] == "health_log" for record in records)
+    assert [len(chat["messages"]) for chat in document["chat_sessions"]] == [2, 2]
@@ -0,0 +1,177 @@
+import os
+import time
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import speech_recognition as sr
+
+from http_client import http_client
+from resilience import groq_guard
+from vad import detect_speech_segments
+
+logger = logging.getLogger(__name__)
+
+# Groq speech-to-text endpoint
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_TRANSCRIBE_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+GROQ_WHISPER_MODEL = os.environ.get("GROQ_WHISPER_MODEL", "whisper-large-v3")
+
+# Backends tried in order until one returns text (override via environment)
+TRANSCRIPTION_BACKENDS = [name.strip() for name in
+                          os.environ.get("TRANSCRIPTION_BACKENDS", "google,groq").split(",")
+                          if name.strip()]
+
+# Long clips are split on pauses and their segments transcribed concurrently
+TRANSCRIPTION_SEGMENTED = os.environ.get("TRANSCRIPTION_SEGMENTED", "true").lower() == "true"
+TRANSCRIPTION_SEGMENT_MIN_SECONDS = float(os.environ.get("TRANSCRIPTION_SEGMENT_MIN_SECONDS", "30"))
+TRANSCRIPTION_WORKERS = int(os.environ.get("TRANSCRIPTION_WORKERS", "4"))
+
+class TranscriptionError(Exception):
+    """Raised by a backend that could not produce a transcript"""
+
+@dataclass
+class BackendStats:
+    attempts: int = 0
+    successes: int = 0
+    skipped: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.attempts if self.attempts else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts if self.attempts else 0.0
+
+# Shared recognizer; recognize_* calls don't mutate it
+recognizer = sr.Recognizer()
+
+def transcribe_google(audio: sr.AudioData) -> str:
+    """Transcribe with Google's free web speech API"""
+    try:
+        return recognizer.recognize_google(audio)
+    except sr.UnknownValueError:
+        raise TranscriptionError("Google Speech Recognition could not understand audio")
+    except sr.RequestError as e:
+        raise TranscriptionError(f"Could not reach Google Speech Recognition: {str(e)}")
+
+def transcribe_groq(audio: sr.AudioData) -> str:
+    """Transcribe with Groq's hosted Whisper model"""
+    wav_bytes = audio.get_wav_data()
+    response = groq_guard.call(lambda: http_client.post(
+        GROQ_TRANSCRIBE_URL,
+        name="groq.transcribe",
+        headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
+        files={"file": ("audio.wav", wav_bytes, "audio/wav")},
+        data={"model": GROQ_WHISPER_MODEL, "response_format": "json"}
+    ))
+    response.raise_for_status()
+    return response.json().get("text", "")
+
+# Registered backends: name -> (transcribe function, availability check)
+BACKENDS: Dict[str, tuple] = {
+    "google": (transcribe_google, lambda: True),
+    "groq": (transcribe_groq, lambda: bool(GROQ_API_KEY)),
+}
+
+class TranscriptionPipeline:
+    """Runs each configured backend at most once per clip, in order, until one succeeds"""
+
+    def __init__(self, backends: List[str] = None):
+        self.backends = backends or TRANSCRIPTION_BACKENDS
+        unknown = [name for name in self.backends if name not in BACKENDS]
+        if unknown:
+            logger.warning(f"Ignoring unknown transcription backends: {', '.join(unknown)}")
+        self.backends = [name for name in self.backends if name in BACKENDS]
+        self._lock = Lock()
+        self._stats: Dict[str, BackendStats] = {name: BackendStats() for name in self.backends}
+        # Bounded pool shared by every segmented transcription in this process
+        self._executor = ThreadPoolExecutor(max_workers=TRANSCRIPTION_WORKERS,
+                                            thread_name_prefix="transcribe")
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        """Return the first non-empty transcript, or None if every backend failed"""
+        for name in self.backends:
+            func, available = BACKENDS[name]
+            if not available():
+                self._record(name, skipped=True)
+                continue
+
+            start_time = time.time()
+            try:
+                text = (func(audio) or "").strip()
+                if not text:
+                    raise TranscriptionError("Empty transcript")
+                self._record(name, duration=(time.time() - start_time) * 1000, success=True)
+                logger.info(f"Transcribed audio with {name}")
+                return text
+            except Exception as e:
+                self._record(name, duration=(time.time() - start_time) * 1000, error=str(e))
+                logger.error(f"[Transcription] {name} failed: {str(e)}")
+        return None
+
+    def transcribe_segmented(self, audio: sr.AudioData) -> Optional[str]:
+        """
+        Transcribe speech segments concurrently and stitch them back together in order
+
+        If any segment fails or comes back empty, the stitched text would
+        silently miss part of the message, so the whole clip is transcribed
+        in a single pass instead.
+        """
+        segments = detect_speech_segments(audio.frame_data, audio.sample_rate, audio.sample_width)
+        if len(segments) <= 1:
+            return self.transcribe(audio)
+
+        clips = [sr.AudioData(audio.frame_data[start:end], audio.sample_rate, audio.sample_width)
+                 for start, end in segments]
+        try:
+            # map() yields results in submission order regardless of completion order
+            parts = list(self._executor.map(self.transcribe, clips))
+        except Exception as e:
+            logger.error(f"[Transcription] Segmented transcription failed: {str(e)}")
+            parts = [None]
+
+        missing = [index for index, part in enumerate(parts) if not part]
+        if missing:
+            logger.warning(f"[Transcription] {len(missing)} of {len(clips)} segments produced no text "
+                           f"(segments {missing}); retrying as a single pass")
+            return self.transcribe(audio)
+        return " ".join(parts)
+
+    def transcribe_clip(self, audio: sr.AudioData) -> Optional[str]:
+        """Transcribe a clip, segmenting it first when it is long enough to benefit"""
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        if TRANSCRIPTION_SEGMENTED and duration >= TRANSCRIPTION_SEGMENT_MIN_SECONDS:
+            return self.transcribe_segmented(audio)
+        return self.transcribe(audio)
+
+    def _record(self, name: str, duration: float = 0.0, success: bool = False,
+                skipped: bool = False, error: str = None):
+        with self._lock:
+            stats = self._stats[name]
+            if skipped:
+                stats.skipped += 1
+                return
+            stats.attempts += 1
+            stats.total_ms += duration
+            stats.last_ms = duration
+            stats.max_ms = max(stats.max_ms, duration)
+            if success:
+                stats.successes += 1
+            else:
+                stats.last_error = error
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(asdict(stats), avg_ms=stats.avg_ms, success_rate=stats.success_rate)
+                    for name, stats in self._stats.items()}
+
+# Global transcription pipeline instance
+transcription_pipeline = TranscriptionPipeline()
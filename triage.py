@@ -0,0 +1,145 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Severity levels shared with ChatMessage.severity_level
+SEVERITY_NONE = 0
+SEVERITY_LOW = 1
+SEVERITY_MEDIUM = 2
+SEVERITY_HIGH = 3
+
+@dataclass(frozen=True)
+class TriageTerm:
+    keyword: str
+    category: str
+    severity: int
+    emergency: bool = False
+
+# Red flags that warrant emergency care
+RED_FLAGS = {
+    "cardiac": ["chest pain", "chest tightness", "chest pressure", "heart attack", "crushing pain",
+                "pain spreading to arm", "pain radiating to jaw"],
+    "respiratory": ["can't breathe", "cant breathe", "cannot breathe", "unable to breathe", "not breathing",
+                    "difficulty breathing", "trouble breathing", "shortness of breath", "gasping for air",
+                    "choking", "blue lips", "turning blue"],
+    "neurological": ["stroke", "face drooping", "slurred speech", "sudden numbness", "numbness on one side",
+                     "weakness on one side", "seizure", "convulsions", "unconscious", "unresponsive",
+                     "passed out", "fainted", "loss of consciousness", "worst headache of my life",
+                     "sudden severe headache", "stiff neck and fever", "head injury", "sudden confusion"],
+    "bleeding": ["severe bleeding", "heavy bleeding", "bleeding heavily", "won't stop bleeding",
+                 "vomiting blood", "coughing up blood", "coughing blood", "blood in vomit", "black stool"],
+    "allergic": ["anaphylaxis", "throat swelling", "swollen throat", "tongue swelling", "severe allergic reaction"],
+    "mental_health": ["suicidal", "suicide", "kill myself", "end my life", "self harm", "self-harm",
+                      "hurt myself", "want to die"],
+    "toxicology": ["overdose", "overdosed", "poisoning", "poisoned", "swallowed bleach"],
+}
+
+# Symptoms that usually need prompt medical attention
+MODERATE_SYMPTOMS = {
+    "fever": ["high fever", "fever for three days", "persistent fever", "fever over 103"],
+    "gastrointestinal": ["persistent vomiting", "can't keep food down", "can't keep fluids down", "dehydration",
+                         "dehydrated", "blood in stool", "bloody stool", "severe abdominal pain",
+                         "severe stomach pain"],
+    "urinary": ["blood in urine", "painful urination", "can't urinate"],
+    "musculoskeletal": ["fracture", "broken bone", "dislocated", "can't move my", "can't walk"],
+    "cardiac": ["palpitations", "racing heart", "irregular heartbeat", "fainting"],
+    "respiratory": ["wheezing", "persistent cough", "breathlessness"],
+    "neurological": ["migraine", "dizziness", "dizzy", "vertigo", "blurred vision", "double vision", "numbness"],
+    "skin": ["burn", "infected wound", "pus", "spreading rash", "cellulitis", "deep cut"],
+    "pregnancy": ["pregnant and bleeding", "reduced fetal movement"],
+    "modifiers": ["severe", "getting worse", "worsening", "unbearable", "excruciating"],
+}
+
+# Everyday symptoms and health topics
+COMMON_SYMPTOMS = {
+    "general": ["fever", "fatigue", "tired", "tiredness", "weakness", "chills", "body ache", "body aches",
+                "weight loss", "weight gain", "loss of appetite", "night sweats"],
+    "head": ["headache", "head ache", "earache", "ear pain", "toothache", "sore throat", "runny nose",
+             "stuffy nose", "blocked nose", "nasal congestion", "congestion", "sinus", "sneezing"],
+    "respiratory": ["cough", "dry cough", "wet cough", "cold", "flu", "phlegm", "mucus"],
+    "gastrointestinal": ["nausea", "vomiting", "diarrhea", "diarrhoea", "constipation", "stomach ache",
+                         "stomach pain", "abdominal pain", "bloating", "gas", "heartburn", "acid reflux",
+                         "indigestion", "cramps"],
+    "musculoskeletal": ["back pain", "neck pain", "joint pain", "knee pain", "muscle pain", "sprain",
+                        "stiffness", "swelling"],
+    "skin": ["rash", "itching", "itchy", "acne", "pimple", "hives", "eczema", "dry skin", "blister", "mole",
+             "lesion", "redness", "bruise"],
+    "mental_health": ["anxiety", "anxious", "stress", "stressed", "depression", "depressed", "insomnia",
+                      "can't sleep", "panic attack", "mood swings"],
+    "allergic": ["allergy", "allergies", "allergic"],
+    "chronic": ["diabetes", "blood pressure", "hypertension", "asthma", "thyroid", "cholesterol"],
+    "general_pain": ["pain", "ache", "sore", "hurts"],
+}
+
+# Alert wording produced by the vision and response models
+ALERT_TERMS = {
+    "alert": ["emergency", "urgent", "critical", "immediate attention", "immediate medical attention"],
+}
+
+NEGATION_PATTERN = re.compile(r"\b(?:no|not|without|denies|deny|never|don't have|do not have)\b(?:\s+\w+){0,2}\s*$")
+CLAUSE_BREAK = re.compile(r"[.,;:!?]|\b(?:but|and|although|though|however|now)\b")
+NEGATION_WINDOW = 32
+
+def _build_vocabulary() -> Dict[str, TriageTerm]:
+    vocabulary: Dict[str, TriageTerm] = {}
+    tiers = [
+        (COMMON_SYMPTOMS, SEVERITY_LOW, False),
+        (MODERATE_SYMPTOMS, SEVERITY_MEDIUM, False),
+        (ALERT_TERMS, SEVERITY_HIGH, False),
+        (RED_FLAGS, SEVERITY_HIGH, True),
+    ]
+    # Later tiers win when a phrase appears in more than one list
+    for groups, severity, emergency in tiers:
+        for category, keywords in groups.items():
+            for keyword in keywords:
+                key = _normalize(keyword)
+                vocabulary[key] = TriageTerm(key, category, severity, emergency)
+    return vocabulary
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower().replace("’", "'")).strip()
+
+def _compile(vocabulary: Dict[str, TriageTerm]) -> re.Pattern:
+    # Longest phrases first so "chest pain" wins over "pain" at the same position
+    alternatives = sorted(vocabulary, key=len, reverse=True)
+    body = "|".join(re.escape(term).replace(r"\ ", r"\s+") for term in alternatives)
+    return re.compile(rf"(?<![\w'])(?:{body})(?![\w'])", re.IGNORECASE)
+
+VOCABULARY = _build_vocabulary()
+MATCHER = _compile(VOCABULARY)
+
+def triage_text(text: str) -> Dict[str, Any]:
+    """Score free text for severity (0-3), emergency red flags and symptom keywords"""
+    if not text:
+        return {"severity": SEVERITY_NONE, "emergency": False, "keywords": [], "categories": []}
+
+    normalized = text.replace("’", "'")
+    severity = SEVERITY_NONE
+    emergency = False
+    keywords: List[str] = []
+    categories: List[str] = []
+
+    for match in MATCHER.finditer(normalized):
+        # Skip negated mentions such as "no chest pain"
+        preceding = normalized[max(0, match.start() - NEGATION_WINDOW):match.start()].lower()
+        preceding = CLAUSE_BREAK.split(preceding)[-1]
+        if NEGATION_PATTERN.search(preceding):
+            continue
+
+        term = VOCABULARY[_normalize(match.group(0))]
+        severity = max(severity, term.severity)
+        emergency = emergency or term.emergency
+        if term.keyword not in keywords:
+            keywords.append(term.keyword)
+        if term.category not in categories:
+            categories.append(term.category)
+
+    return {
+        "severity": severity,
+        "emergency": emergency,
+        "keywords": keywords,
+        "categories": categories
+    }
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import json
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import ImageAnalysis
+from gemini_service import is_failed_analysis
+
+logger = logging.getLogger(__name__)
+
+# Uploads up to this size are hashed in memory; larger ones spill to disk
+UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+# Partial files older than this were left behind by a crashed worker
+UPLOAD_TEMP_MAX_AGE = float(os.environ.get("UPLOAD_TEMP_MAX_AGE", "3600"))
+
+# Largest total size of a chunked upload
+CHUNKED_UPLOAD_MAX_BYTES = int(os.environ.get("CHUNKED_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+TEMP_PREFIX = ".upload-"
+# mkstemp creates 0600 files; stored uploads get the mode open() would give them
+_umask = os.umask(0)
+os.umask(_umask)
+UPLOAD_FILE_MODE = 0o666 & ~_umask
+CHUNK_SIZE = 64 * 1024
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+class ChunkedUploadError(Exception):
+    """Raised when a chunk can't be appended to a chunked upload"""
+
+class UploadTooLarge(ChunkedUploadError):
+    """Raised when a chunk would take an upload past CHUNKED_UPLOAD_MAX_BYTES"""
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of an upload's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def store_upload(source: Union[bytes, BinaryIO], filename: str, folder: str) -> Tuple[str, str]:
+    """
+    Store an upload once under its content hash
+
+    Identical bytes map to the same file, so a re-upload reuses the copy
+    already on disk instead of writing a new one. Streams are hashed through
+    a spooled buffer that only touches disk above UPLOAD_SPOOL_MAX_BYTES.
+
+    Args:
+        source: Uploaded file bytes or a readable binary stream
+        filename: Original filename, used only for its extension
+        folder: Upload directory
+
+    Returns:
+        Tuple of (stored file path, content hash)
+    """
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_BYTES, dir=folder) as spool:
+        if isinstance(source, bytes):
+            digest = content_hash(source)
+            spool.write(source)
+        else:
+            sha256 = hashlib.sha256()
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                sha256.update(chunk)
+                spool.write(chunk)
+            digest = sha256.hexdigest()
+
+        extension = os.path.splitext(filename)[1].lower()
+        filepath = os.path.join(folder, f"{digest}{extension}")
+
+        if os.path.exists(filepath):
+            logger.info(f"Upload {digest[:12]} already stored, reusing {filepath}")
+            return filepath, digest
+
+        # Write to a temp file first so concurrent uploads never see a partial file
+        spool.seek(0)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(spool, f, CHUNK_SIZE)
+            os.chmod(tmp_path, UPLOAD_FILE_MODE)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return filepath, digest
+
+def _chunked_paths(folder: str, upload_id: str) -> Tuple[str, str]:
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ChunkedUploadError("Invalid upload id")
+    base = os.path.join(folder, f"{TEMP_PREFIX}{upload_id}")
+    return f"{base}.part", f"{base}.json"
+
+def create_chunked_upload(folder: str, meta: Dict[str, Any]) -> str:
+    """
+    Start a chunked upload and return its id
+
+    Chunks are appended to a partial file in the upload folder; its
+    metadata (owner, extension) sits in a JSON file next to it. Both use
+    the temp prefix, so abandoned uploads are removed by the sweeper.
+    """
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _chunked_paths(folder, upload_id)
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return upload_id
+
+def get_chunked_upload(folder: str, upload_id: str) -> Optional[Dict[str, Any]]:
+    """Return the upload's metadata and bytes received so far, or None if unknown"""
+    try:
+        part_path, meta_path = _chunked_paths(folder, upload_id)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta["size"] = os.path.getsize(part_path)
+        return meta
+    except (ChunkedUploadError, FileNotFoundError, ValueError):
+        return None
+
+def append_chunk(folder: str, upload_id: str, stream: BinaryIO, offset: int) -> int:
+    """
+    Append a chunk read from stream to a chunked upload
+
+    The offset must equal the bytes received so far, so a client retrying a
+    chunk after a lost response can't write it twice. The check and the
+    write happen under an exclusive lock on the partial file, so a retry
+    racing the original request waits and then fails the offset check.
+
+    Returns:
+        Total bytes received
+    """
+    part_path, _ = _chunked_paths(folder, upload_id)
+    with open(part_path, 'ab') as f:
+        # Released when the file is closed
+        fcntl.flock(f, fcntl.LOCK_EX)
+        size = f.seek(0, os.SEEK_END)
+        if offset != size:
+            raise ChunkedUploadError(f"Expected offset {size}, got {offset}")
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > CHUNKED_UPLOAD_MAX_BYTES:
+                f.truncate(offset)
+                raise UploadTooLarge("Upload is too large")
+            f.write(chunk)
+    return size
+
+def commit_chunked_upload(folder: str, upload_id: str, filename: str) -> Tuple[str, str]:
+    """Move a finished chunked upload into the content-addressed store"""
+    part_path, _ = _chunked_paths(folder, upload_id)
+    try:
+        sha256 = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        extension = os.path.splitext(filename)[1].lower()
+        filepath = os.path.join(folder, f"{digest}{extension}")
+        # The partial file already sits in the upload folder, so it is renamed into place
+        if not os.path.exists(filepath):
+            os.replace(part_path, filepath)
+        return filepath, digest
+    finally:
+        discard_chunked_upload(folder, upload_id)
+
+def discard_chunked_upload(folder: str, upload_id: str):
+    """Delete a chunked upload's partial file and metadata"""
+    for path in _chunked_paths(folder, upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+def sweep_temp_files(folder: str, max_age: float = UPLOAD_TEMP_MAX_AGE) -> int:
+    """Remove partial uploads orphaned by a crash; returns the number removed"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.startswith(TEMP_PREFIX) or not entry.is_file():
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+    except FileNotFoundError:
+        return 0
+
+    if removed:
+        logger.info(f"Removed {removed} orphaned temp files from {folder}")
+    return removed
+
+def get_or_create_analysis(digest: str, prompt_version: str, compute: Callable[[], Any]) -> Any:
+    """
+    Return the stored analysis for an image, running compute() on a miss
+
+    Fallback results from a failed analysis are returned but not stored,
+    so a later retry gets another chance at the vision model.
+    """
+    cached = ImageAnalysis.query.filter_by(content_hash=digest, prompt_version=prompt_version).first()
+    if cached:
+        logger.info(f"Reusing image analysis for {digest[:12]} ({prompt_version})")
+        return json.loads(cached.result)
+
+    result = compute()
+    if is_failed_analysis(result):
+        return result
+
+    try:
+        db.session.add(ImageAnalysis(
+            content_hash=digest,
+            prompt_version=prompt_version,
+            result=json.dumps(result)
+        ))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same analysis first
+        db.session.rollback()
+
+    return result
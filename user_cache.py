@@ -0,0 +1,45 @@
+import os
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from cache import LRUTTLCache
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Per-worker user cache settings (override via environment). Other workers only
+# see a profile change or account deletion once their entry expires.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))
+
+user_cache = LRUTTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+def _snapshot(user: User) -> User:
+    """Detached copy of a user's column values, safe to share between requests"""
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+def load_user(user_id: int) -> Optional[User]:
+    """
+    Flask-Login user loader backed by the per-worker cache
+
+    Hits are merged into the request's session without a query, so each
+    request still gets its own attached instance that it can modify and
+    commit.
+    """
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.set(user_id, _snapshot(user))
+    return user
+
+def invalidate_user(user_id: int):
+    """Drop a user from this worker's cache after their row changes"""
+    user_cache.delete(user_id)
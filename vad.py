@@ -0,0 +1,113 @@
+import os
+import sys
+import math
+import logging
+import operator
+from array import array
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Voice activity detection settings (override via environment)
+VAD_FRAME_MS = 30
+VAD_MIN_ENERGY = int(os.environ.get("VAD_MIN_ENERGY", "300"))
+VAD_ENERGY_RATIO = float(os.environ.get("VAD_ENERGY_RATIO", "2.5"))
+VAD_MIN_SILENCE_MS = int(os.environ.get("VAD_MIN_SILENCE_MS", "500"))
+VAD_MIN_SPEECH_MS = int(os.environ.get("VAD_MIN_SPEECH_MS", "250"))
+VAD_PADDING_MS = int(os.environ.get("VAD_PADDING_MS", "200"))
+VAD_MAX_SEGMENT_SECONDS = float(os.environ.get("VAD_MAX_SEGMENT_SECONDS", "30"))
+
+# array typecodes for signed little-endian PCM sample widths
+SAMPLE_TYPECODES = {1: 'b', 2: 'h', 4: 'i' if array('i').itemsize == 4 else 'l'}
+
+def frame_rms(frame: bytes, sample_width: int) -> int:
+    """RMS of a frame of signed little-endian PCM samples"""
+    samples = array(SAMPLE_TYPECODES[sample_width], frame)
+    if not samples:
+        return 0
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return int(math.sqrt(sum(map(operator.mul, samples, samples)) / len(samples)))
+
+def frame_energies(pcm: bytes, sample_rate: int, sample_width: int) -> List[int]:
+    """RMS energy of each VAD_FRAME_MS frame of mono PCM; empty for unsupported sample widths"""
+    if sample_width not in SAMPLE_TYPECODES:
+        logger.warning(f"VAD does not support {sample_width * 8}-bit audio; skipping segmentation")
+        return []
+    frame_bytes = sample_rate * VAD_FRAME_MS // 1000 * sample_width
+    return [frame_rms(pcm[i:i + frame_bytes], sample_width)
+            for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+
+def energy_threshold(energies: List[int]) -> float:
+    """Speech threshold calibrated from the clip's own noise floor
+
+    The floor is the 10th percentile frame energy; the threshold is capped
+    halfway to the 90th percentile so clips with little silence still split.
+    """
+    if not energies:
+        return VAD_MIN_ENERGY
+    ordered = sorted(energies)
+    noise_floor = ordered[len(ordered) // 10]
+    speech_level = ordered[len(ordered) * 9 // 10]
+    return max(VAD_MIN_ENERGY, min(noise_floor * VAD_ENERGY_RATIO, (noise_floor + speech_level) / 2))
+
+def detect_speech_segments(pcm: bytes, sample_rate: int, sample_width: int,
+                           max_segment_seconds: float = VAD_MAX_SEGMENT_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Split mono PCM into speech segments
+
+    Frames above the energy threshold are speech; runs of silence longer
+    than VAD_MIN_SILENCE_MS end a segment. Neighbouring segments are merged
+    up to max_segment_seconds so short pauses don't produce tiny requests,
+    and longer stretches of speech are cut at that length.
+
+    Returns:
+        List of (start, end) byte offsets into pcm, in order
+    """
+    energies = frame_energies(pcm, sample_rate, sample_width)
+    if not energies:
+        return []
+
+    threshold = energy_threshold(energies)
+    frame_bytes = sample_rate * VAD_FRAME_MS // 1000 * sample_width
+    min_silence = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+    min_speech = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    padding = VAD_PADDING_MS // VAD_FRAME_MS
+    max_frames = max(1, int(max_segment_seconds * 1000 / VAD_FRAME_MS))
+
+    # Find runs of speech frames separated by enough silence
+    regions = []
+    start = None
+    silence = 0
+    for index, energy in enumerate(energies):
+        if energy >= threshold:
+            if start is None:
+                start = index
+            silence = 0
+        elif start is not None:
+            silence += 1
+            if silence >= min_silence:
+                regions.append((start, index - silence + 1))
+                start = None
+                silence = 0
+    if start is not None:
+        regions.append((start, len(energies) - silence))
+
+    regions = [(max(0, s - padding), min(len(energies), e + padding))
+               for s, e in regions if e - s >= min_speech]
+
+    # Merge neighbours up to the maximum length, then cut anything still too long
+    merged = []
+    for s, e in regions:
+        if merged and e - merged[-1][0] <= max_frames:
+            merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+
+    segments = []
+    for s, e in merged:
+        for cut in range(s, e, max_frames):
+            segments.append((cut * frame_bytes, min(e, cut + max_frames) * frame_bytes))
+
+    logger.info(f"VAD found {len(segments)} speech segments (threshold {threshold:.0f})")
+    return segments